@@ -27,10 +27,12 @@ setuptools.setup(
         "License :: MIT",
         "Operating System :: OS Independent",
     ],
-    install_requires=["matplotlib"],
+    install_requires=["matplotlib", "numpy"],
     python_requires=">=3",
     entry_points={
-        # pylint: disable=line-too-long
-        "console_scripts": ["data-analysis = tracking_analysis.data_analysis:main"]
+        "console_scripts": [
+            "tracking_analysis = tracking_analysis.cli:main",
+            "data-analysis = tracking_analysis.data_analysis:main",
+        ]
     },
 )
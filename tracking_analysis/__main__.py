@@ -0,0 +1,6 @@
+"""Run the tracking_analysis command with python -m tracking_analysis."""
+
+from .cli import main
+
+if __name__ == "__main__":
+    main()
@@ -1,113 +1,423 @@
 """Utility functions for analyzing data."""
 
+import contextlib
 import json
-import math
 import os.path
+import queue
+import tempfile
+import threading
 
+import numpy
 
-def read_bounding_boxes(data_root):
+from . import binary_results
+from . import bounding_boxes
+from . import dataset_index
+from . import metrics
+
+RESULT_FILES = ["result.bin", "result.json"]
+"""list: The tracking result file names, in order of preference."""
+
+GROUND_TRUTH_FILES = ["groundtruth_rect.bin", "groundtruth_rect.txt"]
+"""list: The ground truth file names, in order of preference."""
+
+ATTRIBUTES_FILE = "attributes.txt"
+"""string: The name of a sequence's OTB attributes file."""
+
+
+def read_bounding_boxes(data_root, cache=None):
     """
     Read bounding box data for a data set.
 
-    Each sequence in the data set is an entry in a dict. The key is the sequence
-    name. The value a list of dicts. Each dict in the list is a bounding box.
-    The bounding box keys are "x", "y", "width", and "height".
+    Each sequence in the data set is an entry in a BoxSet. The key is the
+    sequence name. The value is a BoxSequence with one bounding box per frame.
 
     Parameters:
     data_root (string): The root directory of the data set.
+    cache (DatasetCache): The parsed file cache for the data set root. If this
+        is None, every file is parsed.
 
     Returns:
-    dict: The returned data has the following form:
-    { sequence : [ { x: y: width: height: }, ... ], ... }
+    BoxSet: The bounding box data for each sequence in the data set.
     """
-    sequences = next(os.walk(data_root))[1]
-    sequences.sort()
-    boxes = {}
-    for sequence in sequences:
-        if os.path.exists(os.path.join(data_root, sequence, "result.json")):
-            boxes[sequence] = _read_bounding_boxes_from_json(
-                os.path.join(data_root, sequence, "result.json")
-            )
-        elif os.path.exists(
-            os.path.join(data_root, sequence, "groundtruth_rect.txt")
-        ):
-            boxes[sequence] = _read_bounding_boxes_from_text(
-                os.path.join(data_root, sequence, "groundtruth_rect.txt")
-            )
+    index = dataset_index.RootIndex(data_root)
+    boxes = bounding_boxes.BoxSet()
+    for sequence in index.sequences:
+        filename = find_bounding_box_file(
+            index, sequence, RESULT_FILES + GROUND_TRUTH_FILES
+        )
+        if filename is not None:
+            boxes[sequence] = read_bounding_box_file(filename, cache)
         else:
             print("error: bounding box data not found in", sequence)
     return boxes
 
 
-def write_otb_data(content):
+def iterate_bounding_boxes(
+    ground_truth_root,
+    result_root,
+    sequences=None,
+    prefetch=0,
+    ground_truth_cache=None,
+    result_cache=None,
+    ground_truth_index=None,
+    result_index=None,
+):
+    """
+    Read ground truth and tracking results one sequence at a time.
+
+    Only one sequence, plus the prefetched sequences, is held in memory at a
+    time, so memory use does not grow with the size of the data set. Note that
+    a DatasetCache keeps every array it reads in memory.
+
+    Parameters:
+    ground_truth_root (string): The root directory of the ground truth data.
+    result_root (string): The root directory of the tracking results.
+    sequences (list): The sequences to read, in order. If this is None, every
+        sequence directory in the ground truth root is read, sorted by name.
+    prefetch (int): The number of sequences to read ahead on a background
+        thread. If this is 0, each sequence is read when it is requested.
+    ground_truth_cache (DatasetCache): The parsed file cache for the ground
+        truth root, or None.
+    result_cache (DatasetCache): The parsed file cache for the result root, or
+        None.
+    ground_truth_index (RootIndex): The index of the ground truth root. If
+        this is None, the root is scanned.
+    result_index (RootIndex): The index of the result root. If this is None,
+        the root is scanned.
+
+    Yields:
+    tuple: The sequence name, the ground truth BoxSequence, and the result
+    BoxSequence. Sequences which are missing either file are skipped.
+    """
+    if ground_truth_index is None:
+        ground_truth_index = dataset_index.RootIndex(
+            ground_truth_root, sequences
+        )
+    if result_index is None:
+        result_index = dataset_index.RootIndex(result_root, sequences)
+    if sequences is None:
+        sequences = ground_truth_index.sequences
+    items = _read_sequence_pairs(
+        ground_truth_index,
+        result_index,
+        sequences,
+        ground_truth_cache,
+        result_cache,
+    )
+    if prefetch > 0:
+        items = _prefetch(items, prefetch)
+    yield from items
+
+
+def find_bounding_box_file(index, sequence, names):
+    """
+    Find the preferred bounding box file for a sequence.
+
+    A binary file is preferred only while it is at least as new as the JSON or
+    text file with the same name, so a result which is written again after it
+    was converted is not hidden by the stale binary file.
+
+    Parameters:
+    index (RootIndex): The index of the data set root.
+    sequence (string): The sequence name.
+    names (list): The candidate file names, in order of preference.
+
+    Returns:
+    string: The path to the preferred file. None is returned if no candidate
+    is in the sequence directory.
+    """
+    filename = index.find(sequence, names)
+    if filename is None or not filename.endswith(binary_results.EXTENSION):
+        return filename
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    source = index.find(
+        sequence,
+        [
+            name
+            for name in names
+            if os.path.splitext(name)[0] == stem
+            and not name.endswith(binary_results.EXTENSION)
+        ],
+    )
+    if source is not None and _modified(filename) < _modified(source):
+        return source
+    return filename
+
+
+def read_bounding_box_file(filename, cache=None):
+    """
+    Read the bounding boxes for one sequence.
+
+    Parameters:
+    filename (string): The path to the bounding box file. This can be a JSON
+        tracking result, a text ground truth file, or a binary result file.
+    cache (DatasetCache): The parsed file cache for the file's data set root.
+        If this is None, the file is parsed. Binary result files are memory
+        mapped instead of cached.
+
+    Returns:
+    BoxSequence: The bounding boxes read from the file. None is returned if the
+    file does not exist, is not a supported format, or is malformed.
+    """
+    _, extension = os.path.splitext(filename)
+    parse = _PARSERS.get(extension)
+    if parse is None:
+        print(f"error: {filename} is not a bounding box file")
+        return None
+    try:
+        if extension == binary_results.EXTENSION:
+            return bounding_boxes.BoxSequence(parse(filename))
+        if cache is not None:
+            return bounding_boxes.BoxSequence(cache.read(filename, parse))
+        return bounding_boxes.BoxSequence(parse(filename))
+    except FileNotFoundError:
+        print(f"error: {filename} does not exist")
+    except ValueError as error:
+        print(f"error: {error}")
+    return None
+
+
+def read_attributes(filename, cache=None):
+    """
+    Read the OTB attributes of a sequence.
+
+    Parameters:
+    filename (string): The path to the attributes file, or None if the
+        sequence has none. The file has one attribute per line.
+    cache (DatasetCache): The parsed file cache for the file's data set root.
+        If this is None, the file is parsed.
+
+    Returns:
+    list: The attribute names. None is returned if the file does not exist.
+    """
+    if filename is None:
+        return None
+    try:
+        if cache is not None:
+            return cache.read(filename, _read_attributes).tolist()
+        return _read_attributes(filename).tolist()
+    except FileNotFoundError:
+        return None
+
+
+def parse_bounding_box_text(text, filename="<text>"):
+    """
+    Parse text bounding box data, such as an OTB groundtruth_rect.txt file.
+
+    Each non-empty line has one box: x, y, width, and height. The values can be
+    separated by commas, tabs, spaces, or a mix of these, because the OTB
+    ground truth files use all of them.
+
+    Parameters:
+    text (string): The bounding box text.
+    filename (string): The file name to use in error messages.
+
+    Returns:
+    numpy.ndarray: An (N, 4) array of the bounding boxes.
+
+    Raises:
+    ValueError: At least one line does not have four numbers. The message
+    lists each malformed line by line number.
+    """
+    lines = text.splitlines()
+    rows = [line.replace(",", " ").split() for line in lines]
+    rows = [row for row in rows if row]
+    if all(len(row) == 4 for row in rows):
+        try:
+            return numpy.array(rows, dtype=numpy.float64).reshape(-1, 4)
+        except ValueError:
+            pass
+    raise ValueError(
+        "\n".join(
+            f"{filename}:{number}: {message}"
+            for number, message in _find_malformed_lines(lines)
+        )
+    )
+
+
+def write_otb_data(content, filename="file.json"):
     """
     Write OTB data to a JSON file.
 
+    The file is written with open_atomically(), so readers never see a partial
+    file.
+
     Parameters:
     content (dict): The data to write to the file.
+    filename (string): The path to the JSON file.
     """
-    with open("file.json", "w") as f:
+    with open_atomically(filename) as f:
         json.dump(content, f, indent=2)
 
 
+@contextlib.contextmanager
+def open_atomically(filename, mode="w", **kwargs):
+    """
+    Open a file which replaces its destination only once it is complete.
+
+    The file is a temporary file in the destination's directory. When the
+    block ends, it replaces the destination. If the block raises an exception,
+    the temporary file is removed and the destination is left as it was.
+
+    Parameters:
+    filename (string): The path to the destination file.
+    mode (string): The mode in which to open the file, such as "w" or "wb".
+    kwargs: Other arguments for open(), such as newline.
+
+    Yields:
+    file: The open temporary file.
+    """
+    f = tempfile.NamedTemporaryFile(  # pylint: disable=R1732
+        mode,
+        dir=os.path.dirname(os.path.abspath(filename)),
+        suffix=os.path.splitext(filename)[1],
+        delete=False,
+        **kwargs,
+    )
+    try:
+        with f:
+            yield f
+    except BaseException:
+        os.unlink(f.name)
+        raise
+    os.chmod(f.name, 0o644)
+    os.replace(f.name, filename)
+
+
 def calcualte_center_error(exp_data, gt_data):
     """Calculate the center error for a set of bounding box data.
 
     Parameters:
-    exp_data (dict): The experimental bounding box data for a data set.
-    gt_data (dict): The ground truth bounding box data for a data set.
+    exp_data (BoxSet): The experimental bounding box data for a data set.
+    gt_data (BoxSet): The ground truth bounding box data for a data set.
 
     Returns:
     dict: A dictionary of the following form
-    { sequence: [ error, ... ], ... }
-    For each sequence, there is a list of distances between the centers of the
-    experimental and ground truth bounding boxes. Each distance corresponds to
-    one frame from the sequence.
-    """
-    errors = {}
-    for sequence in exp_data:
-        errors[sequence] = []
-        exp_boxes = exp_data[sequence]
-        gt_boxes = gt_data[sequence]
-        for exp_box, gt_box in zip(exp_boxes, gt_boxes):
-            exp_center = _calculate_center(exp_box)
-            gt_center = _calculate_center(gt_box)
-            errors[sequence].append(_calculate_distance(exp_center, gt_center))
-    return errors
+    { sequence: numpy.ndarray, ... }
+    For each sequence, there is an array of distances between the centers of
+    the experimental and ground truth bounding boxes. Each distance corresponds
+    to one frame from the sequence.
+    """
+    return metrics.calculate_dataset_center_errors(gt_data, exp_data)
 
 
 # ------------------------------------------------------------------------------
 #                                                      internal implementation
 # ------------------------------------------------------------------------------
+def _read_sequence_pairs(
+    ground_truth_index,
+    result_index,
+    sequences,
+    ground_truth_cache,
+    result_cache,
+):
+    for sequence in sequences:
+        ground_truth_file = find_bounding_box_file(
+            ground_truth_index, sequence, GROUND_TRUTH_FILES
+        )
+        result_file = find_bounding_box_file(
+            result_index, sequence, RESULT_FILES
+        )
+        if ground_truth_file is None or result_file is None:
+            continue
+        ground_truth = read_bounding_box_file(
+            ground_truth_file, ground_truth_cache
+        )
+        result = read_bounding_box_file(result_file, result_cache)
+        if ground_truth is not None and result is not None:
+            yield sequence, ground_truth, result
+
+
+def _prefetch(iterable, count):
+    items = queue.Queue(maxsize=count)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def produce():
+        try:
+            for item in iterable:
+                put((True, item))
+                if stop.is_set():
+                    return
+        except Exception as error:  # pylint: disable=broad-except
+            put((False, error))
+            return
+        put((False, None))
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            is_item, item = items.get()
+            if not is_item:
+                if item is not None:
+                    raise item
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def _modified(filename):
+    try:
+        return os.stat(filename).st_mtime_ns
+    except OSError:
+        return 0
+
+
 def _read_bounding_boxes_from_json(filename):
     with open(filename) as f:
         document = json.load(f)["res"]
-        return [_make_bounding_box_from_json(entry) for entry in document]
-
-
-def _make_bounding_box_from_json(entry):
-    return {"x": entry[0], "y": entry[1], "width": entry[2], "height": entry[3]}
+    try:
+        boxes = numpy.array(document, dtype=numpy.float64)
+    except (ValueError, TypeError) as error:
+        raise ValueError(f"{filename}: {error}") from error
+    if boxes.size == 0:
+        return boxes.reshape(0, 4)
+    if boxes.ndim != 2 or boxes.shape[1] != 4:
+        raise ValueError(
+            f"{filename}: bounding boxes must have the shape (N, 4), not "
+            f"{boxes.shape}"
+        )
+    return boxes
 
 
 def _read_bounding_boxes_from_text(filename):
     with open(filename) as f:
-        lines = f.readlines()
-    return [_make_bounding_box_from_text(line) for line in lines]
+        return parse_bounding_box_text(f.read(), filename)
 
 
-def _make_bounding_box_from_text(string):
-    values = string.strip().rsplit(",")
-    return {
-        "x": float(values[0]),
-        "y": float(values[1]),
-        "width": float(values[2]),
-        "height": float(values[3]),
-    }
+def _find_malformed_lines(lines):
+    malformed = []
+    for number, line in enumerate(lines, start=1):
+        values = line.replace(",", " ").split()
+        if not values:
+            continue
+        if len(values) != 4:
+            malformed.append(
+                (number, f"expected 4 values, found {len(values)}")
+            )
+            continue
+        try:
+            [float(value) for value in values]
+        except ValueError:
+            malformed.append((number, f"invalid number in {line.strip()!r}"))
+    return malformed
 
 
-def _calculate_center(box):
-    return (box["x"] + 0.5 * box["width"], box["y"] + 0.5 * box["height"])
+def _read_attributes(filename):
+    with open(filename) as f:
+        return numpy.array([l.strip() for l in f.readlines()], dtype=str)
 
 
-def _calculate_distance(p, q):
-    return math.sqrt((p[0] - q[0]) ** 2 + (p[0] - q[0]) ** 2)
+_PARSERS = {
+    binary_results.EXTENSION: binary_results.read_results,
+    ".json": _read_bounding_boxes_from_json,
+    ".txt": _read_bounding_boxes_from_text,
+}
@@ -0,0 +1,160 @@
+"""
+Aggregate tracking statistics by OTB attribute.
+
+The attributes of all sequences are loaded into one sequence by attribute
+boolean matrix. The per-attribute statistics are masked means over the
+sequences, computed for every attribute at once with a matrix product.
+"""
+
+import csv
+
+import numpy
+
+from . import data_sets
+from . import metrics
+
+STATISTICS = ["mean_iou", "auc", "precision"]
+"""list: The per-sequence statistics which are aggregated by attribute."""
+
+ALL_SEQUENCES = "all"
+"""string: The name of the summary row which covers every sequence."""
+
+
+def summarize_sequence(ious, center_errors):
+    """
+    Calculate the summary statistics of one tracker on one sequence.
+
+    Parameters:
+    ious (numpy.ndarray): The per-frame IoU.
+    center_errors (numpy.ndarray): The per-frame center error.
+
+    Returns:
+    dict: The mean IoU, the success AUC, and the precision at 20 pixels. The
+    keys are the names in STATISTICS.
+    """
+    valid_ious = ious[~numpy.isnan(ious)]
+    return {
+        "mean_iou": float(valid_ious.mean()) if len(valid_ious) else 0.0,
+        "auc": metrics.calculate_auc(metrics.calculate_success_curve(ious)),
+        "precision": metrics.precision_at(
+            metrics.calculate_precision_curve(center_errors)
+        ),
+    }
+
+
+def make_attribute_matrix(sequence_attributes, attributes=None):
+    """
+    Build the sequence by attribute matrix.
+
+    Parameters:
+    sequence_attributes (list): The attribute names of each sequence. An entry
+        can be None if the sequence has no attribute file.
+    attributes (list): The attributes for the matrix columns. The default is
+        data_sets.ATTRIBUTES. Attribute names not in this list are ignored.
+
+    Returns:
+    numpy.ndarray: A boolean matrix with one row per sequence and one column
+    per attribute.
+    """
+    attributes = data_sets.ATTRIBUTES if attributes is None else attributes
+    columns = {attribute: index for index, attribute in enumerate(attributes)}
+    matrix = numpy.zeros((len(sequence_attributes), len(attributes)), bool)
+    for row, names in enumerate(sequence_attributes):
+        for name in names or []:
+            if name in columns:
+                matrix[row, columns[name]] = True
+    return matrix
+
+
+def aggregate(attribute_matrix, values):
+    """
+    Average per-sequence values over the sequences with each attribute.
+
+    Parameters:
+    attribute_matrix (numpy.ndarray): The (S, A) sequence by attribute matrix.
+    values (numpy.ndarray): The (S, ...) per-sequence values. NaN values are
+        left out of the averages.
+
+    Returns:
+    tuple: The (A, ...) per-attribute means, and the (A, ...) number of values
+    in each mean. A mean over no values is NaN.
+    """
+    values = numpy.asarray(values, dtype=numpy.float64)
+    valid = ~numpy.isnan(values)
+    mask = attribute_matrix.T.astype(numpy.float64)
+    shape = (mask.shape[0],) + values.shape[1:]
+    flat = (len(values), int(numpy.prod(values.shape[1:])))
+    totals = mask @ numpy.where(valid, values, 0.0).reshape(flat)
+    counts = mask @ valid.reshape(flat).astype(numpy.float64)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        means = numpy.where(counts > 0, totals / counts, numpy.nan)
+    return means.reshape(shape), counts.reshape(shape).astype(numpy.int64)
+
+
+def summarize_attributes(summaries, trackers, attributes=None, statistics=None):
+    """
+    Build the per-attribute summary table.
+
+    Parameters:
+    summaries (dict): The per-sequence summaries, keyed by sequence name. Each
+        summary has an "attributes" list, and one dict of statistics per
+        tracker, keyed by the tracker name.
+    trackers (list): The tracker names to summarize.
+    attributes (list): The attributes to summarize. The default is
+        data_sets.ATTRIBUTES.
+    statistics (list): The statistics to summarize. The default is
+        STATISTICS.
+
+    Returns:
+    list: One dict per table row. The first row covers all sequences. Each row
+    has an "attribute" name, the "sequences" count, and a
+    "<tracker>_<statistic>" entry for each tracker and statistic.
+    """
+    attributes = data_sets.ATTRIBUTES if attributes is None else attributes
+    statistics = STATISTICS if statistics is None else statistics
+    sequences = sorted(summaries)
+    matrix = make_attribute_matrix(
+        [summaries[s].get("attributes") for s in sequences], attributes
+    )
+    matrix = numpy.hstack([numpy.ones((len(sequences), 1), bool), matrix])
+    rows = [
+        {"attribute": attribute, "sequences": int(count)}
+        for attribute, count in zip(
+            [ALL_SEQUENCES] + list(attributes), matrix.sum(axis=0)
+        )
+    ]
+    for tracker in trackers:
+        values = numpy.array(
+            [
+                [summaries[s][tracker][statistic] for statistic in statistics]
+                for s in sequences
+            ],
+            dtype=numpy.float64,
+        ).reshape(len(sequences), len(statistics))
+        means, _ = aggregate(matrix, values)
+        for row, row_means in zip(rows, means):
+            for statistic, mean in zip(statistics, row_means):
+                row[f"{tracker}_{statistic}"] = float(mean)
+    return rows
+
+
+def write_summary(filename, rows):
+    """
+    Write a summary table to a CSV file.
+
+    Parameters:
+    filename (string): The path to the CSV file.
+    rows (list): The table rows returned by summarize_attributes().
+    """
+    if not rows:
+        return
+    with open(filename, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(
+                {
+                    key: f"{value:.4f}" if isinstance(value, float) else value
+                    for key, value in row.items()
+                }
+            )
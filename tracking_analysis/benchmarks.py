@@ -0,0 +1,311 @@
+"""
+Benchmark the readers, metrics, and rendering on synthetic data sets.
+
+The synthetic data sets have the TB50 or TB100 sequence names and nominal OTB
+frame counts. Each stage is timed separately, and the results are written as
+JSON so they can be compared between revisions. The startup stages time the
+tracking_analysis command in a new interpreter, which catches heavy imports
+creeping back into the command line path.
+"""
+
+import argparse
+import json
+import os.path
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy
+
+from . import analysis_tools
+from . import binary_results
+from . import bounding_boxes
+from . import data_sets
+from . import dataset_cache
+from . import graphs
+from . import metrics
+
+__version__ = "0.0.0"
+
+_STARTUP_COMMANDS = [
+    ("startup_version", ["--version"]),
+    ("startup_analyze", ["analyze", "--version"]),
+]
+
+
+def make_synthetic_data_set(root, sequences, seed=0):
+    """
+    Write a synthetic data set with ground truth and tracking results.
+
+    The ground truth is a random walk for each sequence. The tracking results
+    are the ground truth plus noise. Ground truth files alternate between
+    comma and tab delimiters, like the OTB files do.
+
+    Parameters:
+    root (string): The directory in which to write the data set. The ground
+        truth is written to root/ground_truth, and the results to
+        root/results.
+    sequences (list): The sequence names.
+    seed (int): The random number generator seed.
+
+    Returns:
+    int: The total number of frames written.
+    """
+    generator = numpy.random.default_rng(seed)
+    frames = 0
+    for index, sequence in enumerate(sequences):
+        frame_count = data_sets.FRAME_COUNTS.get(sequence, 500)
+        frames += frame_count
+        steps = generator.normal(0.0, 2.0, (frame_count, 4))
+        steps[:, 2:] *= 0.1
+        boxes = numpy.abs(
+            numpy.cumsum(steps, axis=0) + [200.0, 150.0, 60.0, 80.0]
+        )
+        results = boxes + generator.normal(0.0, 8.0, boxes.shape)
+        gt_directory = os.path.join(root, "ground_truth", sequence)
+        result_directory = os.path.join(root, "results", sequence)
+        os.makedirs(gt_directory, exist_ok=True)
+        os.makedirs(result_directory, exist_ok=True)
+        delimiter = "\t" if index % 2 else ","
+        numpy.savetxt(
+            os.path.join(gt_directory, "groundtruth_rect.txt"),
+            boxes,
+            fmt="%.2f",
+            delimiter=delimiter,
+        )
+        with open(os.path.join(gt_directory, "attributes.txt"), "w") as f:
+            f.write(
+                "\n".join(
+                    generator.choice(data_sets.ATTRIBUTES, 3, replace=False)
+                )
+            )
+        with open(os.path.join(result_directory, "result.json"), "w") as f:
+            json.dump({"res": results.round(2).tolist()}, f)
+    return frames
+
+
+def run_benchmarks(root, sequences, repeat, render_count):
+    """
+    Time each pipeline stage on a synthetic data set.
+
+    Parameters:
+    root (string): The directory which holds the synthetic data set.
+    sequences (list): The sequence names in the data set.
+    repeat (int): The number of times to time each stage.
+    render_count (int): The number of sequences to render in the rendering
+        stages.
+
+    Returns:
+    list: One dict per stage, with the stage "name" and its timings.
+    """
+    gt_root = os.path.join(root, "ground_truth")
+    result_root = os.path.join(root, "results")
+    cache_root = os.path.join(root, "cache")
+    gt = analysis_tools.read_bounding_boxes(gt_root)
+    results = analysis_tools.read_bounding_boxes(result_root)
+    ious = metrics.calculate_dataset_ious(gt, results)
+    errors = metrics.calculate_dataset_center_errors(gt, results)
+    all_ious = numpy.concatenate(list(ious.values()))
+    all_errors = numpy.concatenate(list(errors.values()))
+    _, offsets = metrics.concatenate(gt, list(gt))
+    for sequence in sequences:
+        binary_results.write_results(
+            os.path.join(result_root, sequence, "result.bin"),
+            results[sequence],
+            sequence,
+            "synthetic",
+        )
+    warm_cache = dataset_cache.DatasetCache(gt_root, cache_root)
+    analysis_tools.read_bounding_boxes(gt_root, warm_cache)
+    warm_cache.save()
+    graph = graphs.IouGraph()
+    rendered = sequences[:render_count]
+    stages = [
+        ("parse_text", lambda: _parse_files(gt_root, sequences, "txt")),
+        ("parse_json", lambda: _parse_files(result_root, sequences, "json")),
+        ("open_binary", lambda: _parse_files(result_root, sequences, "bin")),
+        (
+            "read_cached",
+            lambda: analysis_tools.read_bounding_boxes(
+                gt_root, dataset_cache.DatasetCache(gt_root, cache_root)
+            ),
+        ),
+        ("iou", lambda: metrics.calculate_dataset_ious(gt, results)),
+        (
+            "center_error",
+            lambda: metrics.calculate_dataset_center_errors(gt, results),
+        ),
+        (
+            "otb_curves",
+            lambda: (
+                metrics.calculate_success_curve(all_ious),
+                metrics.calculate_precision_curve(all_errors),
+            ),
+        ),
+        (
+            "sequence_curves",
+            lambda: (
+                metrics.calculate_grouped_success_curves(all_ious, offsets),
+                metrics.calculate_grouped_precision_curves(all_errors, offsets),
+            ),
+        ),
+    ]
+    for file_format in graphs.FORMATS:
+        stages.append(
+            (
+                f"render_{file_format}",
+                lambda f=file_format: _render(
+                    graph, rendered, ious, os.path.join(root, "graphs"), f
+                ),
+            )
+        )
+    for name, command in _STARTUP_COMMANDS:
+        stages.append((name, lambda c=command: _run_command(c)))
+    return [_time_stage(name, stage, repeat) for name, stage in stages]
+
+
+def _run_command(arguments):
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    path = os.environ.get("PYTHONPATH")
+    subprocess.run(
+        [sys.executable, "-m", __package__, *arguments],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        env={
+            **os.environ,
+            "PYTHONPATH": (
+                package_root if not path else package_root + os.pathsep + path
+            ),
+        },
+    )
+
+
+def _time_stage(name, stage, repeat):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stage()
+        seconds.append(time.perf_counter() - start)
+    return {
+        "name": name,
+        "seconds": seconds,
+        "min": min(seconds),
+        "median": statistics.median(seconds),
+        "mean": statistics.mean(seconds),
+    }
+
+
+def _parse_files(data_root, sequences, extension):
+    name = {
+        "txt": "groundtruth_rect.txt",
+        "json": "result.json",
+        "bin": "result.bin",
+    }[extension]
+    boxes = bounding_boxes.BoxSet()
+    for sequence in sequences:
+        boxes[sequence] = analysis_tools.read_bounding_box_file(
+            os.path.join(data_root, sequence, name)
+        )
+    return boxes
+
+
+def _render(graph, sequences, ious, output_root, file_format):
+    os.makedirs(output_root, exist_ok=True)
+    for sequence in sequences:
+        graph.update(
+            sequence,
+            ious[sequence],
+            numpy.nanmean(ious[sequence]),
+            ious[sequence],
+            numpy.nanmean(ious[sequence]),
+        )
+        graph.save(
+            os.path.join(output_root, f"{sequence}.{file_format}"), file_format
+        )
+
+
+def _parse_arguments(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Benchmark the readers, metrics, and rendering on a "
+        "synthetic data set.",
+    )
+    parser.add_argument(
+        "--version",
+        action="version",
+        version=__version__,
+        help="Display the version, and exit.",
+    )
+    parser.add_argument(
+        "--data-set",
+        choices=sorted(data_sets.DATA_SETS),
+        default="tb100",
+        help="The data set whose sequences and frame counts are synthesized.",
+    )
+    parser.add_argument(
+        "--repeat",
+        default=5,
+        help="The number of times each stage is timed.",
+        type=int,
+    )
+    parser.add_argument(
+        "--render-count",
+        default=10,
+        help="The number of sequences rendered in the rendering stages.",
+        type=int,
+    )
+    parser.add_argument(
+        "--output",
+        help="The JSON file to which the results are written. The results "
+        "are written to standard output if this is omitted.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None, prog=None):
+    """
+    Time each stage on a synthetic data set, and report the results.
+
+    Parameters:
+    argv (list): The command line arguments. If this is None, sys.argv is
+        used.
+    prog (string): The program name shown in the usage message.
+    """
+    arguments = _parse_arguments(argv, prog)
+    if arguments.repeat < 1:
+        sys.exit("--repeat must be at least 1.")
+    sequences = sorted(data_sets.DATA_SETS[arguments.data_set].sequences)
+    with tempfile.TemporaryDirectory() as root:
+        frames = make_synthetic_data_set(root, sequences)
+        stages = run_benchmarks(
+            root, sequences, arguments.repeat, arguments.render_count
+        )
+    report = {
+        "version": __version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "data_set": arguments.data_set,
+        "sequences": len(sequences),
+        "frames": frames,
+        "repeat": arguments.repeat,
+        "stages": stages,
+    }
+    if arguments.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(os.path.expanduser(arguments.output), "w") as f:
+            json.dump(report, f, indent=2)
+    for stage in stages:
+        print(
+            f"{stage['name']:16} {stage['median'] * 1000.0:10.2f} ms",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
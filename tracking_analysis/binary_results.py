@@ -0,0 +1,132 @@
+"""
+Read and write tracking results in a compact binary format.
+
+A binary result file is a small header followed by an (N, 4) array of
+little-endian float32 bounding boxes. The header has the following layout, with
+all integers little-endian:
+
+    magic          8 bytes  b"TRKBOXES"
+    version        uint32
+    data offset    uint32   The byte offset of the box array.
+    frame count    uint64
+    sequence size  uint16   The length of the UTF-8 sequence name.
+    tracker size   uint16   The length of the UTF-8 tracker name.
+    sequence name
+    tracker name
+    padding        Zeros up to the data offset, which is a multiple of 64.
+
+The box array is opened with numpy.memmap, so reading a file costs almost no
+time or memory until the boxes are used.
+"""
+
+import collections
+import os.path
+import struct
+
+import numpy
+
+EXTENSION = ".bin"
+
+MAGIC = b"TRKBOXES"
+VERSION = 1
+DTYPE = numpy.dtype("<f4")
+
+_HEADER = struct.Struct("<8sIIQHH")
+_ALIGNMENT = 64
+
+ResultHeader = collections.namedtuple(
+    "ResultHeader", ["sequence", "tracker", "frame_count", "data_offset"]
+)
+
+
+def write_results(filename, boxes, sequence, tracker):
+    """
+    Write bounding boxes to a binary result file.
+
+    Parameters:
+    filename (string): The path to the file to write.
+    boxes (BoxSequence): The bounding boxes to write.
+    sequence (string): The name of the sequence the boxes are for.
+    tracker (string): The name of the tracker that produced the boxes.
+    """
+    sequence_bytes = sequence.encode("utf-8")
+    tracker_bytes = tracker.encode("utf-8")
+    names_size = _HEADER.size + len(sequence_bytes) + len(tracker_bytes)
+    data_offset = -(-names_size // _ALIGNMENT) * _ALIGNMENT
+    with open(filename, "wb") as f:
+        f.write(
+            _HEADER.pack(
+                MAGIC,
+                VERSION,
+                data_offset,
+                len(boxes),
+                len(sequence_bytes),
+                len(tracker_bytes),
+            )
+        )
+        f.write(sequence_bytes)
+        f.write(tracker_bytes)
+        f.write(bytes(data_offset - names_size))
+        f.write(numpy.ascontiguousarray(boxes.boxes, dtype=DTYPE).tobytes())
+
+
+def read_header(filename):
+    """
+    Read the header of a binary result file.
+
+    Parameters:
+    filename (string): The path to the binary result file.
+
+    Returns:
+    ResultHeader: The sequence name, tracker name, frame count, and the byte
+    offset of the box data.
+
+    Raises:
+    ValueError: The file is not a binary result file, or is truncated.
+    """
+    with open(filename, "rb") as f:
+        fixed = f.read(_HEADER.size)
+        if len(fixed) != _HEADER.size:
+            raise ValueError(f"{filename} is too short to be a result file")
+        (
+            magic,
+            version,
+            data_offset,
+            frame_count,
+            sequence_size,
+            tracker_size,
+        ) = _HEADER.unpack(fixed)
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not a binary result file")
+        if version != VERSION:
+            raise ValueError(
+                f"{filename} has unsupported format version {version}"
+            )
+        sequence = f.read(sequence_size).decode("utf-8")
+        tracker = f.read(tracker_size).decode("utf-8")
+    expected_size = data_offset + frame_count * 4 * DTYPE.itemsize
+    if os.path.getsize(filename) < expected_size:
+        raise ValueError(f"{filename} is truncated")
+    return ResultHeader(sequence, tracker, frame_count, data_offset)
+
+
+def read_results(filename):
+    """
+    Open the bounding boxes in a binary result file.
+
+    Parameters:
+    filename (string): The path to the binary result file.
+
+    Returns:
+    numpy.ndarray: A read-only, memory-mapped (N, 4) float32 array of boxes.
+    """
+    header = read_header(filename)
+    if header.frame_count == 0:
+        return numpy.empty((0, 4), dtype=DTYPE)
+    return numpy.memmap(
+        filename,
+        dtype=DTYPE,
+        mode="r",
+        offset=header.data_offset,
+        shape=(header.frame_count, 4),
+    )
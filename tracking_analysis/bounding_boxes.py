@@ -0,0 +1,115 @@
+"""Columnar containers for bounding box data."""
+
+import numpy
+
+X = 0
+Y = 1
+WIDTH = 2
+HEIGHT = 3
+
+
+class BoxSequence:
+    """
+    The bounding boxes for one sequence, one box per frame.
+
+    The boxes are stored in an (N, 4) array of floats. N is the number of
+    frames. The columns are x, y, width, and height, in that order.
+    """
+
+    __slots__ = ("boxes",)
+
+    def __init__(self, boxes):
+        """
+        Create a bounding box sequence.
+
+        Parameters:
+        boxes (array-like): The bounding boxes. This must be convertible to an
+            (N, 4) array.
+
+        Raises:
+        ValueError: The boxes do not have the shape (N, 4).
+        """
+        boxes = numpy.asarray(boxes)
+        if not numpy.issubdtype(boxes.dtype, numpy.floating):
+            boxes = boxes.astype(numpy.float64)
+        if boxes.size == 0:
+            boxes = boxes.reshape(0, 4)
+        if boxes.ndim != 2 or boxes.shape[1] != 4:
+            raise ValueError(
+                f"bounding boxes must have the shape (N, 4), not {boxes.shape}"
+            )
+        self.boxes = boxes
+
+    def __len__(self):
+        return self.boxes.shape[0]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return BoxSequence(self.boxes[index])
+        return self.boxes[index]
+
+    def __eq__(self, other):
+        if not isinstance(other, BoxSequence):
+            return NotImplemented
+        return numpy.array_equal(self.boxes, other.boxes, equal_nan=True)
+
+    def __repr__(self):
+        return f"BoxSequence({len(self)} frames)"
+
+    @property
+    def x(self):  # pylint: disable=C0103
+        """numpy.ndarray: The left edge of each box."""
+        return self.boxes[:, X]
+
+    @property
+    def y(self):  # pylint: disable=C0103
+        """numpy.ndarray: The top edge of each box."""
+        return self.boxes[:, Y]
+
+    @property
+    def width(self):
+        """numpy.ndarray: The width of each box."""
+        return self.boxes[:, WIDTH]
+
+    @property
+    def height(self):
+        """numpy.ndarray: The height of each box."""
+        return self.boxes[:, HEIGHT]
+
+    @property
+    def centers(self):
+        """numpy.ndarray: An (N, 2) array of the box centers."""
+        return self.boxes[:, X:WIDTH] + 0.5 * self.boxes[:, WIDTH:]
+
+    @property
+    def areas(self):
+        """numpy.ndarray: The area of each box."""
+        return self.width * self.height
+
+
+class BoxSet(dict):
+    """
+    Bounding box data for a data set.
+
+    Each key is a sequence name. Each value is the BoxSequence for that
+    sequence.
+    """
+
+    @property
+    def frame_count(self):
+        """int: The total number of frames across all sequences."""
+        return sum(len(sequence) for sequence in self.values())
+
+    def subset(self, sequences):
+        """
+        Select some of the sequences in this set.
+
+        Parameters:
+        sequences (iterable): The names of the sequences to select. Names that
+            are not in this set are ignored.
+
+        Returns:
+        BoxSet: A new set with the selected sequences. The sequence data is
+        shared, not copied.
+        """
+        return BoxSet((s, self[s]) for s in sequences if s in self)
@@ -0,0 +1,68 @@
+"""
+The tracking_analysis command, with one subcommand per tool.
+
+Only this module is imported to parse the command line. The module which
+implements a subcommand, and its NumPy and matplotlib dependencies, are imported
+only when that subcommand runs, so --version, --help, and usage errors return
+at once.
+"""
+
+import argparse
+import importlib
+
+__version__ = "0.0.0"
+
+COMMANDS = {
+    "analyze": (
+        "data_analysis",
+        "Compare a control and an experimental tracker on each sequence.",
+    ),
+    "otb": ("to_otb", "Write OTB files for one or more result roots."),
+    "compare": (
+        "compare_trackers",
+        "Rank any number of trackers against the same ground truth.",
+    ),
+    "robustness": ("robustness", "Score a TRE or SRE robustness evaluation."),
+    "convert": (
+        "convert_results",
+        "Convert result files to the binary result format.",
+    ),
+    "benchmark": (
+        "benchmarks",
+        "Benchmark the readers, metrics, and rendering.",
+    ),
+}
+"""dict: The module and the description of each subcommand."""
+
+
+def main(argv=None):
+    """
+    Run a subcommand.
+
+    Parameters:
+    argv (list): The command line arguments, starting with the subcommand. If
+        this is None, sys.argv is used.
+    """
+    parser = argparse.ArgumentParser(
+        prog="tracking_analysis",
+        description="Analyze the results of object tracking experiments.",
+        epilog="Run a command with --help to list its options.",
+    )
+    parser.add_argument(
+        "--version",
+        action="version",
+        version=__version__,
+        help="Display the version, and exit.",
+    )
+    commands = parser.add_subparsers(
+        dest="command", metavar="COMMAND", required=True
+    )
+    for command, (_, description) in COMMANDS.items():
+        commands.add_parser(
+            command, help=description, description=description, add_help=False
+        )
+    arguments, command_arguments = parser.parse_known_args(argv)
+    module = importlib.import_module(
+        f".{COMMANDS[arguments.command][0]}", __package__
+    )
+    module.main(command_arguments, f"{parser.prog} {arguments.command}")
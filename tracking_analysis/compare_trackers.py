@@ -0,0 +1,314 @@
+"""Compare any number of trackers against the same ground truth."""
+
+import argparse
+import csv
+import itertools
+import os.path
+import sys
+
+import numpy
+
+from . import analysis_tools
+from . import attribute_statistics
+from . import data_sets
+from . import dataset_cache
+from . import metrics
+
+__version__ = "0.0.0"
+
+RANKING = "ranking.csv"
+WINNERS = "winners.csv"
+ATTRIBUTE_SUMMARY = "attribute_summary.csv"
+PAIRS = "pairs"
+
+
+def _parse_tracker(value):
+    name, separator, root = value.partition("=")
+    if not separator or not name or not root:
+        raise argparse.ArgumentTypeError(
+            f"{value} is not in the form NAME=ROOT"
+        )
+    return name, os.path.expanduser(root)
+
+
+def _parse_arguments(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Rank any number of trackers against the same ground "
+        "truth.",
+    )
+    parser.add_argument(
+        "--version",
+        action="version",
+        version=__version__,
+        help="Display the version, and exit.",
+    )
+    parser.add_argument(
+        "--tracker",
+        action="append",
+        default=[],
+        dest="trackers",
+        help="A tracker to compare, as NAME=ROOT. ROOT should have each "
+        "sequence as a subdirectory, each with a tracking result file. Repeat "
+        "this option for each tracker.",
+        metavar="NAME=ROOT",
+        type=_parse_tracker,
+    )
+    parser.add_argument(
+        "--ground-truth-root",
+        default="~/Videos/otb",
+        help="The root directory which contains the ground truth sequence "
+        "data. This directory should have each sequence as a subdirectory. "
+        "Within each sequence subdirectory should be a file with the "
+        "ground truth bounding box data.",
+        nargs="?",
+    )
+    parser.add_argument(
+        "--output-root",
+        default=os.getcwd(),
+        help="The root directory to which the tables should be written.",
+        nargs="?",
+    )
+    parser.add_argument(
+        "--symlinks",
+        action="store_true",
+        help=f"Write better and worse symlink trees under {PAIRS}/ for every "
+        "pair of trackers.",
+    )
+    parser.add_argument(
+        "--cache-root",
+        default=dataset_cache.DEFAULT_CACHE_ROOT,
+        help="The directory in which parsed bounding box data is cached "
+        "between runs.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse every file, and do not read or write the cache.",
+    )
+    parser.add_argument(
+        "sequences",
+        help="The sequences to compare. If omitted, every sequence with "
+        "results from all trackers is compared.",
+        nargs="*",
+    )
+    return parser.parse_args(argv)
+
+
+def _validate_arguments(arguments):
+    arguments.ground_truth_root = os.path.expanduser(
+        arguments.ground_truth_root
+    )
+    arguments.output_root = os.path.expanduser(arguments.output_root)
+    if len(arguments.trackers) < 2:
+        sys.exit("At least two --tracker options are required.")
+    names = [name for name, _ in arguments.trackers]
+    if len(set(names)) != len(names):
+        sys.exit("Each --tracker must have a unique name.")
+    for _, root in arguments.trackers:
+        if not os.path.isdir(root):
+            sys.exit(f"{root} is not a directory.")
+    if not os.path.isdir(arguments.ground_truth_root):
+        sys.exit(f"{arguments.ground_truth_root} is not a directory.")
+    if not os.path.isdir(arguments.output_root):
+        sys.exit(f"{arguments.output_root} is not a directory.")
+    unknown = ", ".join(data_sets.unknown_sequences(arguments.sequences))
+    if unknown:
+        print(
+            f"warning: Some sequences are not in any known data set: {unknown}"
+        )
+
+
+def score_trackers(ground_truth, trackers, sequences):
+    """
+    Score every tracker on every sequence in one vectorized pass.
+
+    Parameters:
+    ground_truth (BoxSet): The ground truth data set.
+    trackers (list): The BoxSet of each tracker.
+    sequences (list): The sequences to score. Each must be in the ground truth
+        and in every tracker, with matching frame counts.
+
+    Returns:
+    dict: "ious" and "center_errors" are (K, M) arrays for K trackers and M
+    total frames. "offsets" gives the frames of each sequence. "mean_iou",
+    "auc", and "precision" are (K, S) per-sequence statistics.
+    """
+    gt_boxes, offsets = metrics.concatenate(ground_truth, sequences)
+    tracking_boxes = numpy.stack(
+        [metrics.concatenate(boxes, sequences)[0] for boxes in trackers]
+    )
+    ious = metrics.calculate_ious(gt_boxes, tracking_boxes)
+    errors = metrics.calculate_center_errors(gt_boxes, tracking_boxes)
+    success = metrics.calculate_grouped_success_curves(ious, offsets)
+    precision = metrics.calculate_grouped_precision_curves(errors, offsets)
+    precision_index = numpy.searchsorted(
+        metrics.PRECISION_THRESHOLDS, metrics.PRECISION_THRESHOLD
+    )
+    return {
+        "ious": ious,
+        "center_errors": errors,
+        "offsets": offsets,
+        "mean_iou": metrics.calculate_grouped_means(ious, offsets),
+        "auc": success.mean(axis=-1),
+        "precision": precision[..., precision_index],
+    }
+
+
+def _find_sequences(arguments, ground_truth, trackers):
+    candidates = arguments.sequences or list(ground_truth)
+    sequences = []
+    for sequence in sorted(candidates):
+        if sequence not in ground_truth:
+            print(f"warning: {sequence} has no ground truth")
+            continue
+        lengths = {len(ground_truth[sequence])}
+        missing = [
+            name
+            for (name, _), boxes in zip(arguments.trackers, trackers)
+            if sequence not in boxes
+        ]
+        if missing:
+            print(f"warning: {sequence} has no results for {missing}")
+            continue
+        lengths.update(len(boxes[sequence]) for boxes in trackers)
+        if len(lengths) != 1:
+            print(f"warning: {sequence} has mismatched frame counts")
+            continue
+        sequences.append(sequence)
+    return sequences
+
+
+def _read_bounding_boxes(data_root, arguments):
+    if arguments.no_cache:
+        return analysis_tools.read_bounding_boxes(data_root)
+    cache = dataset_cache.DatasetCache(data_root, arguments.cache_root)
+    boxes = analysis_tools.read_bounding_boxes(data_root, cache)
+    cache.save()
+    return boxes
+
+
+def _write_csv(filename, header, rows):
+    with open(filename, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def _write_ranking(filename, names, scores, winners):
+    wins = numpy.bincount(winners, minlength=len(names))
+    means = {
+        statistic: numpy.nanmean(scores[statistic], axis=1)
+        for statistic in attribute_statistics.STATISTICS
+    }
+    order = numpy.argsort(-means["auc"], kind="stable")
+    _write_csv(
+        filename,
+        ["rank", "tracker"] + attribute_statistics.STATISTICS + ["wins"],
+        [
+            [rank, names[k]]
+            + [f"{means[s][k]:.4f}" for s in attribute_statistics.STATISTICS]
+            + [int(wins[k])]
+            for rank, k in enumerate(order, start=1)
+        ],
+    )
+
+
+def _write_winners(filename, names, sequences, scores, winners):
+    _write_csv(
+        filename,
+        ["sequence", "winner"] + names,
+        [
+            [sequence, names[winners[s]]]
+            + [f"{value:.4f}" for value in scores["mean_iou"][:, s]]
+            for s, sequence in enumerate(sequences)
+        ],
+    )
+
+
+def _make_pair_symlinks(arguments, names, sequences, scores):
+    roots = dict(arguments.trackers)
+    for a, b in itertools.combinations(range(len(names)), 2):
+        pair_root = os.path.join(
+            arguments.output_root, PAIRS, f"{names[a]}_vs_{names[b]}"
+        )
+        for direction in ("better", "worse"):
+            directory = os.path.join(pair_root, direction)
+            os.makedirs(directory, exist_ok=True)
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_symlink():
+                        os.unlink(entry.path)
+        for s, sequence in enumerate(sequences):
+            direction = (
+                "better"
+                if scores["mean_iou"][a, s] <= scores["mean_iou"][b, s]
+                else "worse"
+            )
+            os.symlink(
+                os.path.abspath(os.path.join(roots[names[b]], sequence)),
+                os.path.join(pair_root, direction, sequence),
+            )
+
+
+def main(argv=None, prog=None):
+    """
+    Rank trackers against the same ground truth, and write the tables.
+
+    Parameters:
+    argv (list): The command line arguments. If this is None, sys.argv is
+        used.
+    prog (string): The program name shown in the usage message.
+    """
+    arguments = _parse_arguments(argv, prog)
+    _validate_arguments(arguments)
+    names = [name for name, _ in arguments.trackers]
+    ground_truth = _read_bounding_boxes(arguments.ground_truth_root, arguments)
+    trackers = [
+        _read_bounding_boxes(root, arguments) for _, root in arguments.trackers
+    ]
+    sequences = _find_sequences(arguments, ground_truth, trackers)
+    if not sequences:
+        sys.exit("No sequences have results from every tracker.")
+    print(f"Comparing {len(names)} trackers on {len(sequences)} sequences")
+    scores = score_trackers(ground_truth, trackers, sequences)
+    winners = numpy.argmax(numpy.nan_to_num(scores["mean_iou"], nan=-1), 0)
+    _write_ranking(
+        os.path.join(arguments.output_root, RANKING), names, scores, winners
+    )
+    _write_winners(
+        os.path.join(arguments.output_root, WINNERS),
+        names,
+        sequences,
+        scores,
+        winners,
+    )
+    summaries = {
+        sequence: {
+            "attributes": analysis_tools.read_attributes(
+                os.path.join(
+                    arguments.ground_truth_root,
+                    sequence,
+                    analysis_tools.ATTRIBUTES_FILE,
+                )
+            ),
+            **{
+                name: {
+                    statistic: float(scores[statistic][k, s])
+                    for statistic in attribute_statistics.STATISTICS
+                }
+                for k, name in enumerate(names)
+            },
+        }
+        for s, sequence in enumerate(sequences)
+    }
+    attribute_statistics.write_summary(
+        os.path.join(arguments.output_root, ATTRIBUTE_SUMMARY),
+        attribute_statistics.summarize_attributes(summaries, names),
+    )
+    if arguments.symlinks:
+        _make_pair_symlinks(arguments, names, sequences, scores)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Convert JSON and text bounding box files to the binary result format.
+
+The files are read with analysis_tools, and written with binary_results, so
+binary_results stays a format module which imports nothing from the readers.
+"""
+
+import argparse
+import os.path
+import sys
+
+from . import analysis_tools
+from . import binary_results
+
+__version__ = "0.0.0"
+
+
+def convert_file(filename, sequence, tracker):
+    """
+    Convert a JSON or text bounding box file to the binary format.
+
+    The binary file is written next to the source file, with the same name and
+    the extension replaced by ".bin".
+
+    Parameters:
+    filename (string): The path to the file to convert.
+    sequence (string): The name of the sequence the boxes are for.
+    tracker (string): The name of the tracker that produced the boxes.
+
+    Returns:
+    string: The path to the binary file. None is returned if the source file
+    could not be read.
+    """
+    boxes = analysis_tools.read_bounding_box_file(filename)
+    if boxes is None:
+        return None
+    output = os.path.splitext(filename)[0] + binary_results.EXTENSION
+    binary_results.write_results(output, boxes, sequence, tracker)
+    return output
+
+
+def _parse_arguments(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Convert JSON and text bounding box files to the binary "
+        "result format.",
+    )
+    parser.add_argument(
+        "--version",
+        action="version",
+        version=__version__,
+        help="Display the version, and exit.",
+    )
+    parser.add_argument(
+        "--tracker",
+        default="",
+        help="The tracker name to record in each converted file. The default "
+        "is the name of the data root directory.",
+    )
+    parser.add_argument(
+        "data_roots",
+        help="The root directories to convert. Each directory should have "
+        "each sequence as a subdirectory.",
+        nargs="+",
+    )
+    arguments = parser.parse_args(argv)
+    arguments.data_roots = [os.path.expanduser(r) for r in arguments.data_roots]
+    return arguments
+
+
+def main(argv=None, prog=None):
+    """
+    Convert the result files in data roots to the binary format.
+
+    Parameters:
+    argv (list): The command line arguments. If this is None, sys.argv is
+        used.
+    prog (string): The program name shown in the usage message.
+    """
+    arguments = _parse_arguments(argv, prog)
+    for data_root in arguments.data_roots:
+        if not os.path.isdir(data_root):
+            sys.exit(f"{data_root} is not a directory.")
+        tracker = arguments.tracker or os.path.basename(
+            os.path.normpath(data_root)
+        )
+        sequences = next(os.walk(data_root))[1]
+        sequences.sort()
+        for sequence in sequences:
+            for name in ("result.json", "groundtruth_rect.txt"):
+                filename = os.path.join(data_root, sequence, name)
+                if os.path.exists(filename):
+                    print(f"Converting {filename}")
+                    convert_file(filename, sequence, tracker)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,44 +3,68 @@
 """Generate graphs of IoU data."""
 
 import argparse
+import collections
+import concurrent.futures
+import contextlib
+import cProfile
+import itertools
 import json
 import os.path
 import sys
-
-import matplotlib.pyplot as plt
+import time
+
+import numpy
+
+from . import analysis_tools
+from . import attribute_statistics
+from . import data_sets
+from . import dataset_cache
+from . import dataset_index
+from . import failures
+from . import frame_metrics
+from . import graphs
+from . import metrics
+from . import report
+from . import significance
+from . import stage_timer
 
 __version__ = "0.0.0"
 
-BACKGROUND_CLUTTER = "background_clutter"
-DEFORMATION = "deformation"
-FAST_MOTION = "fast_motion"
-ILLUMINATION_VARIATION = "illumination_variation"
-IN_PLANE_ROTATION = "in_plane_rotation"
-LOW_RESOLUTION = "low_resolution"
-MOTION_BLUR = "motion_blur"
-OCCLUSION = "occlusion"
-OUT_OF_PLANE_ROTATION = "out_of_plane_rotation"
-OUT_OF_VIEW = "out_of_view"
-SCALE_VARIATION = "scale_variation"
-
-ATTRIBUTES = [
-    BACKGROUND_CLUTTER,
-    DEFORMATION,
-    FAST_MOTION,
-    ILLUMINATION_VARIATION,
-    IN_PLANE_ROTATION,
-    LOW_RESOLUTION,
-    MOTION_BLUR,
-    OCCLUSION,
-    OUT_OF_PLANE_ROTATION,
-    OUT_OF_VIEW,
-    SCALE_VARIATION,
-]
-
-
-def _parse_arguments():
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 3
+
+ATTRIBUTE_SUMMARY = "attribute_summary.csv"
+
+FAILURE_SEQUENCES = "failure_sequences.csv"
+FAILURE_ATTRIBUTES = "failure_attributes.csv"
+FAILURE_SEGMENTS = "failure_segments.csv"
+
+REPORT = "report.html"
+REPORT_SUMMARY = "report.json"
+
+TRACKERS = ["control", "experimental"]
+
+_GRAPH = []
+
+_SequenceResult = collections.namedtuple(
+    "_SequenceResult",
+    [
+        "sequence",
+        "attributes",
+        "control_ious",
+        "control_mean",
+        "control_errors",
+        "experimental_ious",
+        "experimental_mean",
+        "experimental_errors",
+        "comparison",
+    ],
+)
+
+
+def _parse_arguments(argv=None, prog=None):
     parser = argparse.ArgumentParser(
-        description="Analyze bounding box data for overlap."
+        prog=prog, description="Analyze bounding box data for overlap."
     )
     parser.add_argument(
         "--version",
@@ -81,225 +105,793 @@ def _parse_arguments():
         help="The root directory to which the graphs should be written.",
         nargs="?",
     )
+    parser.add_argument(
+        "--data-set",
+        choices=sorted(data_sets.DATA_SETS),
+        help="Analyze the sequences of this data set, instead of every "
+        "sequence in the ground truth root. Sequences named on the command "
+        "line must be in this data set.",
+    )
+    parser.add_argument(
+        "--jobs",
+        default=1,
+        help="The number of worker processes used to analyze sequences. The "
+        "default is 1, which analyzes sequences in this process.",
+        type=int,
+    )
+    parser.add_argument(
+        "--io-concurrency",
+        default=8,
+        help="The number of input files read concurrently. Files for "
+        "upcoming sequences are read while the current sequence is scored.",
+        type=int,
+    )
+    parser.add_argument(
+        "--cache-root",
+        default=dataset_cache.DEFAULT_CACHE_ROOT,
+        help="The directory in which parsed bounding box and attribute data "
+        "is cached between runs.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse every file, and do not read or write the cache.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=graphs.FORMATS,
+        default="svg",
+        help="The file format of the per-sequence graphs.",
+    )
+    parser.add_argument(
+        "--multi-page",
+        help="Also render the graphs of all analyzed sequences, in order, into "
+        "this multi-page PDF file. This cannot be used with --incremental or "
+        "--watch.",
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--report",
+        action="store_true",
+        help=f"Write one {REPORT} file, with every sequence's graph and "
+        f"client-side filters, and a {REPORT_SUMMARY} summary, instead of a "
+        "graph file and symbolic links per sequence.",
+    )
+    parser.add_argument(
+        "--export",
+        help="Also write the per-frame IoU and center error of every tracker "
+        "on every analyzed sequence to this directory, as one NumPy column "
+        "file per field.",
+        metavar="DIRECTORY",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only analyze sequences whose input files changed since the "
+        f"last incremental run. The input fingerprints are kept in {MANIFEST} "
+        "in the output root.",
+    )
+    parser.add_argument(
+        "--watch",
+        help="After the analysis, keep running and poll the input roots every "
+        "SECONDS seconds. Sequences whose input files were added or changed "
+        "are analyzed again, and the summaries are rewritten. Parsed files "
+        "stay in memory between polls. This implies --incremental. Press "
+        "Ctrl+C to stop.",
+        metavar="SECONDS",
+        type=float,
+    )
+    parser.add_argument(
+        "--significance",
+        choices=significance.TESTS,
+        help="Classify each sequence as better, worse, or no_difference with "
+        "this paired test on the per-frame IoU. If omitted, sequences are "
+        "classified as better or worse by their mean IoU alone.",
+    )
+    parser.add_argument(
+        "--alpha",
+        default=0.05,
+        help="The significance level of --significance.",
+        type=float,
+    )
+    parser.add_argument(
+        "--resamples",
+        default=10000,
+        help="The number of bootstrap resamples and permutations used by "
+        "--significance.",
+        type=int,
+    )
+    parser.add_argument(
+        "--failures",
+        action="store_true",
+        help="Find where each tracker loses the target. The failures are "
+        f"written to {FAILURE_SEGMENTS}, and their statistics per sequence and "
+        f"per attribute to {FAILURE_SEQUENCES} and {FAILURE_ATTRIBUTES}.",
+    )
+    parser.add_argument(
+        "--failure-threshold",
+        default=failures.FAILURE_THRESHOLD,
+        help="The IoU below which a frame has lost the target.",
+        type=float,
+    )
+    parser.add_argument(
+        "--failure-frames",
+        default=failures.FAILURE_FRAMES,
+        help="The fewest consecutive lost frames which are a failure.",
+        type=int,
+    )
+    parser.add_argument(
+        "--profile",
+        help="Record the wall time and memory of the reading, scoring, "
+        "rendering, and filesystem stages of each sequence. A summary table "
+        "is printed, and every measurement is written to this JSON file.",
+        metavar="TRACE",
+    )
+    parser.add_argument(
+        "--cprofile",
+        help="Run the analysis under cProfile, and write the statistics to "
+        "this file. With --jobs, only the coordinating process is profiled.",
+        metavar="FILE",
+    )
     parser.add_argument(
         "sequences",
         help="The sequences to analyze. If omitted, all sequences are "
         "analyzed.",
         nargs="*",
     )
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
 
 def _validate_arguments(arguments):
-    arguments.experimental_root = os.path.expanduser(
-        arguments.experimental_root
+    for name in ("multi_page", "export", "profile", "cprofile"):
+        if getattr(arguments, name) is not None:
+            setattr(
+                arguments, name, os.path.expanduser(getattr(arguments, name))
+            )
+    for name in (
+        "experimental_root",
+        "control_root",
+        "ground_truth_root",
+        "output_root",
+    ):
+        setattr(arguments, name, os.path.expanduser(getattr(arguments, name)))
+        if not os.path.isdir(getattr(arguments, name)):
+            sys.exit(f"{getattr(arguments, name)} is not a directory.")
+    if arguments.jobs < 1:
+        sys.exit("--jobs must be at least 1.")
+    if arguments.io_concurrency < 1:
+        sys.exit("--io-concurrency must be at least 1.")
+    if not 0.0 < arguments.alpha < 1.0:
+        sys.exit("--alpha must be between 0 and 1.")
+    if arguments.resamples < 1:
+        sys.exit("--resamples must be at least 1.")
+    if not 0.0 < arguments.failure_threshold <= 1.0:
+        sys.exit("--failure-threshold must be in (0, 1].")
+    if arguments.failure_frames < 1:
+        sys.exit("--failure-frames must be at least 1.")
+    if arguments.watch is not None and arguments.watch <= 0.0:
+        sys.exit("--watch must be greater than 0.")
+    arguments.incremental |= arguments.watch is not None
+    if arguments.sequences:
+        _check_sequences(arguments.sequences, arguments.data_set)
+    for name in ("multi_page", "export"):
+        if getattr(arguments, name) is not None and arguments.incremental:
+            sys.exit(
+                f"--{name.replace('_', '-')} needs the per-frame data of every "
+                "sequence, so it cannot be used with --incremental or --watch."
+            )
+
+
+def _check_sequences(sequences, data_set):
+    unknown = ", ".join(data_sets.unknown_sequences(sequences, data_set))
+    if unknown and data_set is not None:
+        sys.exit(
+            f"Some sequences are not in the {data_set} data set: {unknown}"
+        )
+    if unknown:
+        print(
+            f"warning: Some sequences are not in any known data set: {unknown}"
+        )
+    skipped = sorted(frozenset(sequences) & data_sets.BAD_SEQUENCES)
+    if skipped:
+        print(
+            f"warning: skipping {', '.join(skipped)}, whose ground truth does "
+            "not cover every frame"
+        )
+
+
+def _make_symlinks(sequence, output_root, outcome, attributes, file_format):
+    graph = f"../{sequence}.{file_format}"
+    os.symlink(graph, os.path.join(output_root, outcome, f"{sequence}"))
+    if attributes is not None:
+        for attribute in attributes:
+            os.symlink(
+                graph, os.path.join(output_root, attribute, f"{sequence}")
+            )
+
+
+def _get_graph():
+    if not _GRAPH:
+        _GRAPH.append(graphs.IouGraph())
+    return _GRAPH[0]
+
+
+def _graph_ious(result, output):
+    graph = _get_graph()
+    graph.update(
+        result.sequence,
+        result.control_ious,
+        result.control_mean,
+        result.experimental_ious,
+        result.experimental_mean,
     )
-    arguments.control_root = os.path.expanduser(arguments.control_root)
-    arguments.ground_truth_root = os.path.expanduser(
-        arguments.ground_truth_root
+    graph.save(output)
+
+
+def _index_output(arguments):
+    output_index = dataset_index.OutputIndex(
+        arguments.output_root, significance.OUTCOMES + data_sets.ATTRIBUTES
     )
-    arguments.output_root = os.path.expanduser(arguments.output_root)
-    if not os.path.isdir(arguments.experimental_root):
-        sys.exit(f"{arguments.experimental_root} is not a directory.")
-    if not os.path.isdir(arguments.control_root):
-        sys.exit(f"{arguments.control_root} is not a directory.")
-    if not os.path.isdir(arguments.ground_truth_root):
-        sys.exit(f"{arguments.ground_truth_root} is not a directory.")
-    if not os.path.isdir(arguments.output_root):
-        sys.exit(f"{arguments.output_root} is not a directory.")
+    if not arguments.report:
+        for directory in output_index.missing_directories:
+            os.makedirs(
+                os.path.join(arguments.output_root, directory), exist_ok=True
+            )
+    return output_index
 
 
-def _get_all_sequences(ground_truth_root):
-    return next(os.walk(ground_truth_root))[1]
+def _clean_up_sequence(output_index, sequence):
+    for directory in significance.OUTCOMES + data_sets.ATTRIBUTES:
+        output_index.remove(directory, sequence)
+    for file_format in graphs.FORMATS:
+        output_index.remove("", f"{sequence}.{file_format}")
 
 
-def _make_bounding_box_from_text(string):
-    values = string.strip().rsplit(",")
+def _open_caches(arguments):
+    if arguments.no_cache:
+        return {}
     return {
-        "x": float(values[0]),
-        "y": float(values[1]),
-        "width": float(values[2]),
-        "height": float(values[3]),
+        root: dataset_cache.DatasetCache(root, arguments.cache_root)
+        for root in (
+            arguments.ground_truth_root,
+            arguments.control_root,
+            arguments.experimental_root,
+        )
     }
 
 
-def _read_bounding_boxes_from_text(filename):
-    with open(filename) as f:
-        lines = f.readlines()
-    return [_make_bounding_box_from_text(line) for line in lines]
+def _index_inputs(arguments):
+    ground_truth_index = dataset_index.RootIndex(
+        arguments.ground_truth_root, arguments.sequences or None
+    )
+    if not arguments.sequences:
+        arguments.sequences = ground_truth_index.sequences
+    indexes = {
+        root: dataset_index.RootIndex(root, arguments.sequences)
+        for root in (arguments.control_root, arguments.experimental_root)
+    }
+    indexes[arguments.ground_truth_root] = ground_truth_index
+    return indexes
 
 
-def _make_bounding_box_from_json(entry):
-    return {"x": entry[0], "y": entry[1], "width": entry[2], "height": entry[3]}
+def _find_file(index, sequence, names):
+    filename = analysis_tools.find_bounding_box_file(index, sequence, names)
+    if filename is None:
+        return os.path.join(index.data_root, sequence, names[-1])
+    return filename
 
 
-def _read_bounding_boxes_from_json(filename):
-    with open(filename) as f:
-        document = json.load(f)["res"]
-        return [_make_bounding_box_from_json(entry) for entry in document]
+def _input_files(sequence, arguments, indexes):
+    return {
+        "attributes": indexes[arguments.ground_truth_root].find(
+            sequence, [analysis_tools.ATTRIBUTES_FILE]
+        ),
+        "ground_truth": _find_file(
+            indexes[arguments.ground_truth_root],
+            sequence,
+            analysis_tools.GROUND_TRUTH_FILES,
+        ),
+        "control": _find_file(
+            indexes[arguments.control_root],
+            sequence,
+            analysis_tools.RESULT_FILES,
+        ),
+        "experimental": _find_file(
+            indexes[arguments.experimental_root],
+            sequence,
+            analysis_tools.RESULT_FILES,
+        ),
+    }
 
 
-def _read_bounding_boxes(filename):
-    if os.path.exists(filename):
-        _, extension = os.path.splitext(filename)
-        if extension == ".txt":
-            return _read_bounding_boxes_from_text(filename)
-        if extension == ".json":
-            return _read_bounding_boxes_from_json(filename)
-    print(f"error: {filename} does not exist")
-    return None
+def _read(timer, sequence, read, filename, cache):
+    with timer.measure(sequence, "reading"):
+        return read(filename, cache)
 
 
-def _read_attributes(filename):
-    if os.path.exists(filename):
-        with open(filename) as f:
-            return [l.strip() for l in f.readlines()]
-    return None
+def _submit_reads(executor, sequence, files, arguments, caches, timer):
+    return [
+        executor.submit(
+            _read,
+            timer,
+            sequence,
+            analysis_tools.read_attributes,
+            files["attributes"],
+            caches.get(arguments.ground_truth_root),
+        ),
+        executor.submit(
+            _read,
+            timer,
+            sequence,
+            analysis_tools.read_bounding_box_file,
+            files["ground_truth"],
+            caches.get(arguments.ground_truth_root),
+        ),
+        executor.submit(
+            _read,
+            timer,
+            sequence,
+            analysis_tools.read_bounding_box_file,
+            files["control"],
+            caches.get(arguments.control_root),
+        ),
+        executor.submit(
+            _read,
+            timer,
+            sequence,
+            analysis_tools.read_bounding_box_file,
+            files["experimental"],
+            caches.get(arguments.experimental_root),
+        ),
+    ]
 
 
-def _calculate_iou(gt, tracking):  # pylint: disable=C0103
-    left = max(gt["x"], tracking["x"])
-    right = min(gt["x"] + gt["width"], tracking["x"] + tracking["width"])
-    top = max(gt["y"], tracking["y"])
-    bottom = min(gt["y"] + gt["height"], tracking["y"] + tracking["height"])
-    intersection = max(0, right - left) * max(0, bottom - top)
-    union = (
-        gt["width"] * gt["height"]
-        + tracking["width"] * tracking["height"]
-        - intersection
-    )
-    return intersection / union
+def _load_sequences(sequences, files, arguments, caches, timer):
+    upcoming = iter(sequences)
+    pending = collections.deque()
+    with concurrent.futures.ThreadPoolExecutor(
+        arguments.io_concurrency
+    ) as executor:
+        for sequence in itertools.islice(upcoming, arguments.io_concurrency):
+            pending.append(
+                (
+                    sequence,
+                    _submit_reads(
+                        executor,
+                        sequence,
+                        files[sequence],
+                        arguments,
+                        caches,
+                        timer,
+                    ),
+                )
+            )
+        while pending:
+            sequence, reads = pending.popleft()
+            for next_sequence in itertools.islice(upcoming, 1):
+                pending.append(
+                    (
+                        next_sequence,
+                        _submit_reads(
+                            executor,
+                            next_sequence,
+                            files[next_sequence],
+                            arguments,
+                            caches,
+                            timer,
+                        ),
+                    )
+                )
+            yield sequence, [read.result() for read in reads]
 
 
-def _calculate_ious(ground_truth_data, tracking_data):
-    assert len(ground_truth_data) == len(tracking_data)
-    return [
-        _calculate_iou(gt, tracking)
-        for gt, tracking in zip(ground_truth_data, tracking_data)
-    ]
+def _significance_settings(arguments):
+    if arguments.significance is None:
+        return {"test": None}
+    return {
+        "test": arguments.significance,
+        "alpha": arguments.alpha,
+        "resamples": arguments.resamples,
+    }
 
 
-def _make_symlinks(
-    sequence, output_root, mean_control, mean_experimental, attributes
+def _compare(
+    control_ious, control_mean, experimental_ious, experimental_mean, arguments
 ):
-    if mean_control <= mean_experimental:
-        os.symlink(
-            f"../{sequence}.svg",
-            os.path.join(output_root, "better", f"{sequence}"),
+    if arguments.significance is None:
+        outcome = (
+            significance.BETTER
+            if control_mean <= experimental_mean
+            else significance.WORSE
         )
-    else:
-        os.symlink(
-            f"../{sequence}.svg",
-            os.path.join(output_root, "worse", f"{sequence}"),
+        return {**_significance_settings(arguments), "outcome": outcome}
+    comparison = significance.compare(
+        control_ious,
+        experimental_ious,
+        arguments.significance,
+        arguments.alpha,
+        arguments.resamples,
+    )
+    return {**_significance_settings(arguments), **comparison._asdict()}
+
+
+def _failure_settings(arguments):
+    return {
+        "threshold": arguments.failure_threshold,
+        "min_frames": arguments.failure_frames,
+    }
+
+
+def _analyze_failures(result, arguments):
+    settings = _failure_settings(arguments)
+    return {
+        **settings,
+        "first_frame": _first_frame(result.sequence),
+        "control": failures.analyze_failures(
+            result.control_ious, *settings.values()
+        ),
+        "experimental": failures.analyze_failures(
+            result.experimental_ious, *settings.values()
+        ),
+    }
+
+
+def _analyze_sequence(sequence, inputs, arguments):
+    attributes, ground_truth_data, control_data, experimental_data = inputs
+    timer = stage_timer.StageTimer(arguments.profile is not None)
+    if any(
+        data is None
+        for data in (ground_truth_data, control_data, experimental_data)
+    ):
+        return None, timer.records
+    if (
+        not len(ground_truth_data)
+        == len(control_data)
+        == len(experimental_data)
+    ):
+        print(f"warning: {sequence} has mismatched frame counts")
+        return None, timer.records
+    with timer.measure(sequence, "scoring"):
+        control_ious = metrics.calculate_ious(ground_truth_data, control_data)
+        experimental_ious = metrics.calculate_ious(
+            ground_truth_data, experimental_data
         )
-    if attributes is not None:
-        for attribute in attributes:
-            os.symlink(
-                f"../{sequence}.svg",
-                os.path.join(output_root, attribute, f"{sequence}"),
+        control_mean = numpy.nanmean(control_ious)
+        experimental_mean = numpy.nanmean(experimental_ious)
+        result = _SequenceResult(
+            sequence,
+            attributes,
+            control_ious,
+            control_mean,
+            metrics.calculate_center_errors(ground_truth_data, control_data),
+            experimental_ious,
+            experimental_mean,
+            metrics.calculate_center_errors(
+                ground_truth_data, experimental_data
+            ),
+            _compare(
+                control_ious,
+                control_mean,
+                experimental_ious,
+                experimental_mean,
+                arguments,
+            ),
+        )
+    if not arguments.report:
+        with timer.measure(sequence, "rendering"):
+            _graph_ious(
+                result,
+                os.path.join(
+                    arguments.output_root, f"{sequence}.{arguments.format}"
+                ),
             )
+    return result, timer.records
+
+
+def _analyze_sequences(sequences, files, arguments, caches, timer):
+    loaded = _load_sequences(sequences, files, arguments, caches, timer)
+    if arguments.jobs == 1:
+        for sequence, inputs in loaded:
+            result, records = _analyze_sequence(sequence, inputs, arguments)
+            timer.extend(records)
+            yield result
+        return
+    pending = collections.deque()
+    with concurrent.futures.ProcessPoolExecutor(arguments.jobs) as executor:
+        for sequence, inputs in loaded:
+            pending.append(
+                executor.submit(_analyze_sequence, sequence, inputs, arguments)
+            )
+            if len(pending) > 2 * arguments.jobs:
+                result, records = pending.popleft().result()
+                timer.extend(records)
+                yield result
+        while pending:
+            result, records = pending.popleft().result()
+            timer.extend(records)
+            yield result
+
+
+def _read_manifest(output_root):
+    filename = os.path.join(output_root, MANIFEST)
+    if not os.path.exists(filename):
+        return {}
+    try:
+        with open(filename) as f:
+            document = json.load(f)
+        if document["version"] != MANIFEST_VERSION:
+            return {}
+        return document["sequences"]
+    except (ValueError, KeyError):
+        print(f"warning: ignoring unreadable manifest {filename}")
+        return {}
+
+
+def _write_manifest(output_root, manifest):
+    with analysis_tools.open_atomically(
+        os.path.join(output_root, MANIFEST)
+    ) as f:
+        json.dump(
+            {"version": MANIFEST_VERSION, "sequences": manifest},
+            f,
+            indent=2,
+            sort_keys=True,
+        )
 
 
-def _graph_ious(
-    sequence,
-    control_ious,
-    control_mean,
-    experimental_ious,
-    experimental_mean,
-    output_root,
-):
-    plt.clf()
-    plt.suptitle(sequence)
-    plt.plot(range(len(control_ious)), control_ious, "b.")
-    plt.ylabel("Overlap")
-    plt.xlabel("Frame")
-    plt.axhline(y=control_mean, color="blue")
-    plt.plot(range(len(experimental_ious)), experimental_ious, "r.")
-    plt.axhline(y=experimental_mean, color="red")
-    plt.legend([None, "control", None, "experimental"])
-    plt.savefig(os.path.join(output_root, f"{sequence}.svg"))
-
-
-def _make_subdirectories(output_root):
-    os.makedirs(os.path.join(output_root, "better"), exist_ok=True)
-    os.makedirs(os.path.join(output_root, "worse"), exist_ok=True)
-    for attribute in ATTRIBUTES:
-        os.makedirs(os.path.join(output_root, attribute), exist_ok=True)
-
-
-def _clean_up_sequence(output_root, sequence):
-    if os.path.islink(os.path.join(output_root, "better", f"{sequence}")):
-        os.unlink(os.path.join(output_root, "better", f"{sequence}"))
-    if os.path.islink(os.path.join(output_root, "worse", f"{sequence}")):
-        os.unlink(os.path.join(output_root, "worse", f"{sequence}"))
-    for attribute in ATTRIBUTES:
-        if os.path.islink(os.path.join(output_root, attribute, f"{sequence}")):
-            os.unlink(os.path.join(output_root, attribute, f"{sequence}"))
-    if os.path.exists(os.path.join(output_root, f"{sequence}.svg")):
-        os.remove(os.path.join(output_root, f"{sequence}.svg"))
-
-
-def _main():
-    arguments = _parse_arguments()  # pylint: disable=C0103
-    _validate_arguments(arguments)
-    if not arguments.sequences:
-        arguments.sequences = _get_all_sequences(arguments.ground_truth_root)
+def _fingerprint_inputs(files):
+    return {
+        os.path.abspath(filename): dataset_cache.file_fingerprint(filename)
+        for filename in files.values()
+        if filename is not None
+    }
+
+
+def _is_up_to_date(sequence, arguments, manifest, fingerprints, output_index):
+    entry = manifest.get(sequence)
+    if entry is None:
+        return False
+    recorded = {k: tuple(v) if v else v for k, v in entry["inputs"].items()}
+    settings = _significance_settings(arguments)
+    failure_settings = (
+        _failure_settings(arguments) if arguments.failures else {}
+    )
+    return (
+        recorded == fingerprints[sequence]
+        and all(entry["comparison"].get(k) == v for k, v in settings.items())
+        and all(
+            entry.get("failures", {}).get(k) == v
+            for k, v in failure_settings.items()
+        )
+        and (
+            "series" in entry
+            if arguments.report
+            else output_index.contains("", f"{sequence}.{arguments.format}")
+        )
+    )
+
+
+def _summarize_result(result, arguments):
+    summary = {
+        "attributes": result.attributes,
+        "control": attribute_statistics.summarize_sequence(
+            result.control_ious, result.control_errors
+        ),
+        "experimental": attribute_statistics.summarize_sequence(
+            result.experimental_ious, result.experimental_errors
+        ),
+        "comparison": result.comparison,
+    }
+    if arguments.failures:
+        summary["failures"] = _analyze_failures(result, arguments)
+    if arguments.report:
+        summary["series"] = {
+            "control": report.make_series(result.control_ious),
+            "experimental": report.make_series(result.experimental_ious),
+        }
+    return summary
+
+
+def _write_summaries(arguments, summaries):
+    rows = attribute_statistics.summarize_attributes(summaries, TRACKERS)
+    attribute_statistics.write_summary(
+        os.path.join(arguments.output_root, ATTRIBUTE_SUMMARY), rows
+    )
+    if arguments.failures:
+        _write_failures(arguments, summaries)
+    if arguments.report:
+        document = report.make_document(
+            "Control vs. experimental", TRACKERS, summaries, rows
+        )
+        report.write_html(os.path.join(arguments.output_root, REPORT), document)
+        report.write_summary(
+            os.path.join(arguments.output_root, REPORT_SUMMARY), document
+        )
+
+
+def _open_export(arguments):
+    if arguments.export is None:
+        return contextlib.nullcontext()
+    return frame_metrics.MetricsWriter(arguments.export, TRACKERS)
+
+
+def _first_frame(sequence):
+    return data_sets.FRAME_RANGES.get(sequence, (1, None))[0]
+
+
+def _export_result(export, result):
+    first_frame = _first_frame(result.sequence)
+    export.append(
+        "control",
+        result.sequence,
+        result.control_ious,
+        result.control_errors,
+        result.attributes,
+        first_frame,
+    )
+    export.append(
+        "experimental",
+        result.sequence,
+        result.experimental_ious,
+        result.experimental_errors,
+        result.attributes,
+        first_frame,
+    )
+
+
+def _write_failures(arguments, summaries):
+    failure_summaries = {
+        s: {"attributes": summary["attributes"], **summary["failures"]}
+        for s, summary in summaries.items()
+    }
+    attribute_statistics.write_summary(
+        os.path.join(arguments.output_root, FAILURE_SEQUENCES),
+        failures.summarize_sequences(failure_summaries, TRACKERS),
+    )
+    attribute_statistics.write_summary(
+        os.path.join(arguments.output_root, FAILURE_ATTRIBUTES),
+        attribute_statistics.summarize_attributes(
+            failure_summaries, TRACKERS, statistics=failures.STATISTICS
+        ),
+    )
+    failures.write_segments(
+        os.path.join(arguments.output_root, FAILURE_SEGMENTS),
+        failure_summaries,
+        TRACKERS,
+    )
+
+
+def _find_stale_sequences(sequences, files, arguments, output_index, failed):
+    manifest = _read_manifest(arguments.output_root)
+    fingerprints = {s: _fingerprint_inputs(files[s]) for s in sequences}
+    summaries = {
+        s: {k: v for k, v in manifest[s].items() if k != "inputs"}
+        for s in sequences
+        if _is_up_to_date(s, arguments, manifest, fingerprints, output_index)
+    }
+    stale = [
+        s
+        for s in sequences
+        if s not in summaries and failed.get(s) != fingerprints[s]
+    ]
+    return manifest, fingerprints, summaries, stale
+
+
+def _analyze(arguments, timer, caches, failed, changes_only=False):
+    if not arguments.sequences and arguments.data_set is not None:
+        arguments.sequences = list(
+            data_sets.DATA_SETS[arguments.data_set].sequences
+        )
+    indexes = _index_inputs(arguments)
     arguments.sequences.sort()
-    _make_subdirectories(arguments.output_root)
-    BAD_SEQUENCES = ["David", "Diving", "Football1", "Freeman3", "Freeman4"]
-    for sequence in arguments.sequences:
-        if sequence not in BAD_SEQUENCES:
+    output_index = _index_output(arguments)
+    sequences = [
+        s for s in arguments.sequences if s not in data_sets.BAD_SEQUENCES
+    ]
+    files = {s: _input_files(s, arguments, indexes) for s in sequences}
+    manifest = {}
+    fingerprints = {}
+    summaries = {}
+    if arguments.incremental:
+        manifest, fingerprints, summaries, sequences = _find_stale_sequences(
+            sequences, files, arguments, output_index, failed
+        )
+        if changes_only and not sequences:
+            return
+    for sequence in sequences:
+        with timer.measure(sequence, "filesystem"):
+            _clean_up_sequence(output_index, sequence)
+        manifest.pop(sequence, None)
+    multi_page = None
+    if arguments.multi_page is not None:
+        multi_page = graphs.open_multi_page(arguments.multi_page)
+    with _open_export(arguments) as export:
+        for sequence, result in zip(
+            sequences,
+            _analyze_sequences(sequences, files, arguments, caches, timer),
+        ):
             print(f"Analyzing {sequence}")
-            _clean_up_sequence(arguments.output_root, sequence)
-            attributes = _read_attributes(
-                os.path.join(
-                    arguments.ground_truth_root, sequence, "attributes.txt"
-                )
-            )
-            ground_truth_data = _read_bounding_boxes(
-                os.path.join(
-                    arguments.ground_truth_root,
-                    sequence,
-                    "groundtruth_rect.txt",
-                )
-            )
-            control_data = _read_bounding_boxes(
-                os.path.join(arguments.control_root, sequence, "result.json")
-            )
-            experimental_data = _read_bounding_boxes(
-                os.path.join(
-                    arguments.experimental_root, sequence, "result.json"
-                )
-            )
-            if (
-                ground_truth_data is not None
-                and control_data is not None
-                and experimental_data is not None
-            ):
-                control_ious = _calculate_ious(ground_truth_data, control_data)
-                experimental_ious = _calculate_ious(
-                    ground_truth_data, experimental_data
-                )
-                control_mean = sum(control_ious) / len(control_ious)
-                experimental_mean = sum(experimental_ious) / len(
-                    experimental_ious
-                )
-                _graph_ious(
-                    sequence,
-                    control_ious,
-                    control_mean,
-                    experimental_ious,
-                    experimental_mean,
-                    arguments.output_root,
-                )
-                _make_symlinks(
-                    sequence,
-                    arguments.output_root,
-                    control_mean,
-                    experimental_mean,
-                    attributes,
-                )
+            if result is not None:
+                with timer.measure(sequence, "filesystem"):
+                    if not arguments.report:
+                        _make_symlinks(
+                            sequence,
+                            arguments.output_root,
+                            result.comparison["outcome"],
+                            result.attributes,
+                            arguments.format,
+                        )
+                if multi_page is not None:
+                    with timer.measure(sequence, "rendering"):
+                        _graph_ious(result, multi_page)
+                if export is not None:
+                    with timer.measure(sequence, "filesystem"):
+                        _export_result(export, result)
+                summaries[sequence] = _summarize_result(result, arguments)
+                if arguments.incremental:
+                    manifest[sequence] = {
+                        "inputs": fingerprints[sequence],
+                        **summaries[sequence],
+                    }
+            else:
+                failed[sequence] = fingerprints.get(sequence)
+    with timer.measure(None, "rendering"):
+        if multi_page is not None:
+            multi_page.close()
+    with timer.measure(None, "filesystem"):
+        _write_summaries(arguments, summaries)
+        if arguments.incremental:
+            _write_manifest(arguments.output_root, manifest)
+
+
+def _watch(arguments, timer, caches, failed):
+    print(
+        f"Watching the input roots every {arguments.watch:g} seconds. Press "
+        "Ctrl+C to stop."
+    )
+    try:
+        while True:
+            time.sleep(arguments.watch)
+            _analyze(arguments, timer, caches, failed, changes_only=True)
+    except KeyboardInterrupt:
+        pass
+
+
+def _run(arguments, timer):
+    caches = _open_caches(arguments)
+    failed = {}
+    try:
+        _analyze(arguments, timer, caches, failed)
+        if arguments.watch is not None:
+            _watch(arguments, timer, caches, failed)
+    finally:
+        with timer.measure(None, "filesystem"):
+            for cache in caches.values():
+                cache.save()
+
+
+def main(argv=None, prog=None):
+    """
+    Analyze the control and experimental results of each sequence.
+
+    Parameters:
+    argv (list): The command line arguments. If this is None, sys.argv is
+        used.
+    prog (string): The program name shown in the usage message.
+    """
+    arguments = _parse_arguments(argv, prog)  # pylint: disable=C0103
+    _validate_arguments(arguments)
+    timer = stage_timer.StageTimer(arguments.profile is not None)
+    if arguments.cprofile is None:
+        _run(arguments, timer)
+    else:
+        profile = cProfile.Profile()
+        profile.runcall(_run, arguments, timer)
+        profile.dump_stats(arguments.cprofile)
+    if arguments.profile is not None:
+        timer.print_summary()
+        timer.write_trace(arguments.profile)
 
 
 if __name__ == "__main__":
-    _main()
+    main()
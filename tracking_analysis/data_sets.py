@@ -1,4 +1,38 @@
-"""Meta-data for various tracking data sets."""
+"""
+Meta-data for various tracking data sets.
+
+The DATA_SETS registry holds each data set's sequences as a frozenset, so
+detecting a data set, or checking that sequences belong to one, is a set
+lookup instead of a list comparison.
+"""
+
+import collections
+
+BACKGROUND_CLUTTER = "background_clutter"
+DEFORMATION = "deformation"
+FAST_MOTION = "fast_motion"
+ILLUMINATION_VARIATION = "illumination_variation"
+IN_PLANE_ROTATION = "in_plane_rotation"
+LOW_RESOLUTION = "low_resolution"
+MOTION_BLUR = "motion_blur"
+OCCLUSION = "occlusion"
+OUT_OF_PLANE_ROTATION = "out_of_plane_rotation"
+OUT_OF_VIEW = "out_of_view"
+SCALE_VARIATION = "scale_variation"
+
+ATTRIBUTES = [
+    BACKGROUND_CLUTTER,
+    DEFORMATION,
+    FAST_MOTION,
+    ILLUMINATION_VARIATION,
+    IN_PLANE_ROTATION,
+    LOW_RESOLUTION,
+    MOTION_BLUR,
+    OCCLUSION,
+    OUT_OF_PLANE_ROTATION,
+    OUT_OF_VIEW,
+    SCALE_VARIATION,
+]
 
 TB50 = [
     "Basketball",
@@ -56,7 +90,7 @@ TB50 = [
 TB100 = TB50 + [
     "Bird2",
     "BlurCar1",
-    "BlurCar2",
+    "BlurCar3",
     "BlurCar4",
     "Board",
     "Bolt2",
@@ -107,21 +141,229 @@ TB100 = TB50 + [
 ]
 TB100.sort()
 
+FRAME_COUNTS = {
+    "Basketball": 725,
+    "Biker": 142,
+    "Bird1": 408,
+    "Bird2": 99,
+    "BlurBody": 334,
+    "BlurCar1": 742,
+    "BlurCar2": 585,
+    "BlurCar3": 357,
+    "BlurCar4": 380,
+    "BlurFace": 493,
+    "BlurOwl": 631,
+    "Board": 698,
+    "Bolt": 350,
+    "Bolt2": 293,
+    "Box": 1161,
+    "Boy": 602,
+    "Car1": 1020,
+    "Car2": 913,
+    "Car24": 3059,
+    "Car4": 659,
+    "CarDark": 393,
+    "CarScale": 252,
+    "ClifBar": 472,
+    "Coke": 291,
+    "Couple": 140,
+    "Coupon": 327,
+    "Crossing": 120,
+    "Crowds": 347,
+    "Dancer": 225,
+    "Dancer2": 150,
+    "David": 471,
+    "David2": 537,
+    "David3": 252,
+    "Deer": 71,
+    "Diving": 215,
+    "Dog": 127,
+    "Dog1": 1350,
+    "Doll": 3872,
+    "DragonBaby": 113,
+    "Dudek": 1145,
+    "FaceOcc1": 892,
+    "FaceOcc2": 812,
+    "Fish": 476,
+    "FleetFace": 707,
+    "Football": 362,
+    "Football1": 74,
+    "Freeman1": 326,
+    "Freeman3": 460,
+    "Freeman4": 283,
+    "Girl": 500,
+    "Girl2": 1500,
+    "Gym": 767,
+    "Human2": 1128,
+    "Human3": 1698,
+    "Human4": 667,
+    "Human5": 713,
+    "Human6": 792,
+    "Human7": 250,
+    "Human8": 128,
+    "Human9": 305,
+    "Ironman": 166,
+    "Jogging-1": 307,
+    "Jogging-2": 307,
+    "Jump": 122,
+    "Jumping": 313,
+    "KiteSurf": 84,
+    "Lemming": 1336,
+    "Liquor": 1741,
+    "Man": 134,
+    "Matrix": 100,
+    "Mhyang": 1490,
+    "MotorRolling": 164,
+    "MountainBike": 228,
+    "Panda": 1000,
+    "RedTeam": 1918,
+    "Rubik": 1997,
+    "Shaking": 365,
+    "Singer1": 351,
+    "Singer2": 366,
+    "Skater": 160,
+    "Skater2": 435,
+    "Skating1": 400,
+    "Skating2-1": 473,
+    "Skating2-2": 473,
+    "Skiing": 81,
+    "Soccer": 392,
+    "Subway": 175,
+    "Surfer": 376,
+    "Suv": 945,
+    "Sylvester": 1345,
+    "Tiger1": 354,
+    "Tiger2": 365,
+    "Toy": 271,
+    "Trans": 124,
+    "Trellis": 569,
+    "Twinnings": 472,
+    "Vase": 271,
+    "Walking": 412,
+    "Walking2": 500,
+    "Woman": 597,
+}
+"""dict: The nominal number of frames in each OTB sequence."""
+
+
+OTB2013 = [
+    "Basketball",
+    "Bolt",
+    "Boy",
+    "Car4",
+    "CarDark",
+    "CarScale",
+    "Coke",
+    "Couple",
+    "Crossing",
+    "David",
+    "David2",
+    "David3",
+    "Deer",
+    "Dog1",
+    "Doll",
+    "Dudek",
+    "FaceOcc1",
+    "FaceOcc2",
+    "Fish",
+    "FleetFace",
+    "Football",
+    "Football1",
+    "Freeman1",
+    "Freeman3",
+    "Freeman4",
+    "Girl",
+    "Ironman",
+    "Jogging-1",
+    "Jogging-2",
+    "Jumping",
+    "Lemming",
+    "Liquor",
+    "Matrix",
+    "Mhyang",
+    "MotorRolling",
+    "MountainBike",
+    "Shaking",
+    "Singer1",
+    "Singer2",
+    "Skating1",
+    "Skiing",
+    "Soccer",
+    "Subway",
+    "Suv",
+    "Sylvester",
+    "Tiger1",
+    "Tiger2",
+    "Trellis",
+    "Walking",
+    "Walking2",
+    "Woman",
+]
+
+FRAME_RANGES = {
+    "David": (300, 770),
+    "Diving": (1, 215),
+    "Football1": (1, 74),
+    "Freeman3": (1, 460),
+    "Freeman4": (1, 283),
+}
+"""
+dict: The first and last image frames, inclusive, which have ground truth, for
+sequences whose ground truth does not cover every image. Tracking results for
+these sequences often do not line up with the ground truth.
+"""
+
+BAD_SEQUENCES = frozenset(FRAME_RANGES)
+"""frozenset: The sequences which are left out of analysis by default."""
+
+DataSet = collections.namedtuple("DataSet", ["name", "sequences"])
+"""namedtuple: A data set name, and a frozenset of its sequence names."""
+
+DATA_SETS = {
+    name: DataSet(name, frozenset(sequences))
+    for name, sequences in (
+        ("otb2013", OTB2013),
+        ("tb50", TB50),
+        ("tb100", TB100),
+    )
+}
+"""dict: The known data sets, keyed by name."""
+
+_NAMES_BY_SEQUENCES = {
+    data_set.sequences: name for name, data_set in DATA_SETS.items()
+}
+_KNOWN_SEQUENCES = frozenset().union(
+    *(data_set.sequences for data_set in DATA_SETS.values())
+)
+
 
 def determine_data_set(sequences):
     """
-    Try to determine which data set a list of sequences is.
+    Try to determine which data set a collection of sequences is.
+
+    Parameters:
+    sequences (iterable): The sequence names, in any order. Any iterable, such
+        as a list or dict keys, may be used.
+
+    Returns:
+    string: The name of the data set. None is returned if the sequences do not
+    exactly match a particular data set.
+    """
+    return _NAMES_BY_SEQUENCES.get(frozenset(sequences))
+
+
+def unknown_sequences(sequences, data_set=None):
+    """
+    Find the sequences which are not part of a data set.
 
     Parameters:
-    sequences (list): A list of strings. Each string is a sequence.
+    sequences (iterable): The sequence names.
+    data_set (string): The name of the data set. If this is None, the
+        sequences are checked against every known data set.
 
     Returns:
-    None is returned if the sequences do not exactly match a particular data
-    set.
-    string: The name of the data set as a string.
+    list: The sorted names which are not in the data set.
     """
-    if TB50 == sequences:
-        return "tb50"
-    if TB100 == sequences:
-        return "tb100"
-    return None
+    if data_set is None:
+        return sorted(frozenset(sequences) - _KNOWN_SEQUENCES)
+    return sorted(frozenset(sequences) - DATA_SETS[data_set].sequences)
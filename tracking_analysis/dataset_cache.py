@@ -0,0 +1,114 @@
+"""
+A persistent cache of parsed data set files.
+
+Each data set root has one .npz cache file. The cache stores the parsed array
+for each file along with the file's modification time and size. A cached array
+is used only when the file's modification time and size still match, so a
+changed file is parsed again the next time it is read.
+"""
+
+import hashlib
+import json
+import os.path
+
+import numpy
+
+from . import analysis_tools
+
+DEFAULT_CACHE_ROOT = os.path.join("~", ".cache", "tracking_analysis")
+
+_MANIFEST_KEY = "manifest"
+
+
+class DatasetCache:
+    """The parsed file cache for one data set root."""
+
+    def __init__(self, data_root, cache_root=DEFAULT_CACHE_ROOT):
+        """
+        Open the cache for a data set root.
+
+        Parameters:
+        data_root (string): The root directory of the data set.
+        cache_root (string): The directory which holds the cache files.
+        """
+        self.data_root = os.path.abspath(data_root)
+        digest = hashlib.sha1(self.data_root.encode("utf-8")).hexdigest()
+        self.filename = os.path.join(
+            os.path.expanduser(cache_root), f"{digest}.npz"
+        )
+        self._entries = {}
+        self._modified = False
+        self._load()
+
+    def read(self, filename, parse):
+        """
+        Read a parsed file from the cache, or parse and cache it.
+
+        Parameters:
+        filename (string): The path to the file.
+        parse (callable): The function which parses the file. It is called
+            with the file name and must return a numpy.ndarray.
+
+        Returns:
+        numpy.ndarray: The parsed file contents.
+        """
+        key = os.path.relpath(os.path.abspath(filename), self.data_root)
+        fingerprint = file_fingerprint(filename)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            return entry[1]
+        value = parse(filename)
+        self._entries[key] = (fingerprint, value)
+        self._modified = True
+        return value
+
+    def save(self):
+        """Write the cache to disk, if anything was added since it was read."""
+        if not self._modified:
+            return
+        directory = os.path.dirname(self.filename)
+        os.makedirs(directory, exist_ok=True)
+        keys = sorted(self._entries)
+        manifest = {
+            key: [str(index), *self._entries[key][0]]
+            for index, key in enumerate(keys)
+        }
+        arrays = {
+            str(index): self._entries[key][1] for index, key in enumerate(keys)
+        }
+        arrays[_MANIFEST_KEY] = numpy.array(json.dumps(manifest))
+        with analysis_tools.open_atomically(self.filename, "wb") as f:
+            numpy.savez(f, **arrays)
+        self._modified = False
+
+    def _load(self):
+        if not os.path.exists(self.filename):
+            return
+        try:
+            with numpy.load(self.filename) as archive:
+                manifest = json.loads(str(archive[_MANIFEST_KEY]))
+                self._entries = {
+                    key: (tuple(value[1:]), archive[value[0]])
+                    for key, value in manifest.items()
+                }
+        except (OSError, ValueError, KeyError):
+            print(f"warning: ignoring unreadable cache {self.filename}")
+            self._entries = {}
+
+
+def file_fingerprint(filename):
+    """
+    Identify the current version of a file.
+
+    Parameters:
+    filename (string): The path to the file.
+
+    Returns:
+    tuple: The file's modification time, in nanoseconds, and size. None is
+    returned if the file does not exist.
+    """
+    try:
+        status = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return (status.st_mtime_ns, status.st_size)
@@ -0,0 +1,140 @@
+"""
+Index data set roots and output trees with one directory scan each.
+
+Checking for each candidate file with os.path.exists() costs one stat call per
+file, which is slow on network file systems. These indexes read each directory
+once with os.scandir(), and answer existence queries from memory.
+"""
+
+import os
+
+
+class RootIndex:
+    """The sequence directories of a data set root, and the files in each."""
+
+    def __init__(self, data_root, sequences=None):
+        """
+        Scan a data set root.
+
+        Parameters:
+        data_root (string): The root directory of the data set. Each sequence
+            is a subdirectory.
+        sequences (iterable): The sequences to scan. If this is None, every
+            subdirectory is scanned. Requested sequences without a directory
+            are left out of the index.
+        """
+        self.data_root = data_root
+        directories = _list_entries(data_root, directories=True)
+        if sequences is not None:
+            directories &= set(sequences)
+        self._files = {
+            sequence: frozenset(
+                _list_entries(os.path.join(data_root, sequence), False)
+            )
+            for sequence in directories
+        }
+
+    def __contains__(self, sequence):
+        return sequence in self._files
+
+    @property
+    def sequences(self):
+        """list: The sorted names of the indexed sequences."""
+        return sorted(self._files)
+
+    def files(self, sequence):
+        """
+        Get the names of the files in a sequence directory.
+
+        Parameters:
+        sequence (string): The sequence name.
+
+        Returns:
+        frozenset: The file names. The set is empty if the sequence is not in
+        the index.
+        """
+        return self._files.get(sequence, frozenset())
+
+    def find(self, sequence, names):
+        """
+        Find the preferred file for a sequence.
+
+        Parameters:
+        sequence (string): The sequence name.
+        names (list): The candidate file names, in order of preference.
+
+        Returns:
+        string: The path to the first candidate in the sequence directory.
+        None is returned if no candidate is in the directory.
+        """
+        files = self.files(sequence)
+        for name in names:
+            if name in files:
+                return os.path.join(self.data_root, sequence, name)
+        return None
+
+
+class OutputIndex:
+    """The files and symbolic links in an analysis output tree."""
+
+    def __init__(self, output_root, directories):
+        """
+        Scan an output tree.
+
+        Parameters:
+        output_root (string): The root of the output tree.
+        directories (list): The subdirectories of the output root to scan.
+            Missing subdirectories are indexed as empty.
+        """
+        self.output_root = output_root
+        self._entries = {"": _list_entries(output_root, False)}
+        subdirectories = _list_entries(output_root, True)
+        for directory in directories:
+            self._entries[directory] = (
+                _list_entries(os.path.join(output_root, directory), False)
+                if directory in subdirectories
+                else set()
+            )
+        self.missing_directories = [
+            d for d in directories if d not in subdirectories
+        ]
+
+    def contains(self, directory, name):
+        """
+        Check if a file is in the output tree.
+
+        Parameters:
+        directory (string): The indexed subdirectory, or "" for the root.
+        name (string): The file name.
+
+        Returns:
+        bool: True if the file was in the tree when it was scanned, and has
+        not been removed since.
+        """
+        return name in self._entries.get(directory, ())
+
+    def remove(self, directory, name):
+        """
+        Remove a file from the output tree, if it is indexed.
+
+        Parameters:
+        directory (string): The indexed subdirectory, or "" for the root.
+        name (string): The file name.
+        """
+        entries = self._entries.get(directory, set())
+        if name in entries:
+            os.unlink(os.path.join(self.output_root, directory, name))
+            entries.discard(name)
+
+
+# ------------------------------------------------------------------------------
+#                                                      internal implementation
+# ------------------------------------------------------------------------------
+def _list_entries(directory, directories):
+    try:
+        with os.scandir(directory) as entries:
+            return {
+                entry.name for entry in entries if entry.is_dir() == directories
+            }
+    except (FileNotFoundError, NotADirectoryError):
+        return set()
@@ -0,0 +1,237 @@
+"""
+Find where a tracker loses its target.
+
+A failure is a run of at least a minimum number of frames with IoU below a
+threshold. Each per-frame IoU array is scanned once: the frames below the
+threshold are run-length encoded with numpy.diff(), and the runs which are long
+enough are the failures. A failure is recovered if a later frame has an IoU at
+or above the threshold, and its length is the recovery latency: the frames from
+the first lost frame to the recovered frame. A failure which is not recovered
+lasts through its last lost frame.
+
+VOT counts a failure whenever the overlap drops to zero, and re-initializes the
+tracker five frames later. OTB results are not re-initialized, so the VOT count
+here is the number of zero-overlap runs, where runs less than five frames apart
+count once.
+
+Frames with a NaN IoU, where the ground truth is missing, say nothing about the
+tracker, so they are skipped: they neither fail nor recover, and they do not
+end a run. A loss which continues past a gap in the ground truth is one
+failure, and a failure followed only by NaN frames is not recovered. Lengths
+and latencies are in image frames, so they include the skipped frames, but
+the failed fraction counts only frames with ground truth.
+"""
+
+import csv
+
+import numpy
+
+FAILURE_THRESHOLD = 0.1
+"""float: The default IoU below which a frame has lost the target."""
+
+FAILURE_FRAMES = 5
+"""int: The default number of consecutive lost frames which is a failure."""
+
+VOT_SKIP = 5
+"""int: The frames VOT skips after a failure before re-initializing."""
+
+STATISTICS = ["failures", "failed_fraction", "mean_recovery", "vot_failures"]
+"""list: The per-sequence failure statistics which are aggregated."""
+
+
+def run_lengths(mask):
+    """
+    Run-length encode the True values of a boolean array.
+
+    Parameters:
+    mask (numpy.ndarray): The boolean array.
+
+    Returns:
+    tuple: The start index and the length of each run of True values.
+    """
+    padded = numpy.zeros(len(mask) + 2, numpy.int8)
+    padded[1:-1] = mask
+    changes = numpy.diff(padded)
+    starts = numpy.flatnonzero(changes == 1)
+    return starts, numpy.flatnonzero(changes == -1) - starts
+
+
+def failure_segments(
+    ious, threshold=FAILURE_THRESHOLD, min_frames=FAILURE_FRAMES
+):
+    """
+    Find the failures of a tracker on one sequence.
+
+    Parameters:
+    ious (numpy.ndarray): The per-frame IoU.
+    threshold (float): The IoU below which a frame has lost the target.
+    min_frames (int): The fewest consecutive lost frames which are a failure.
+        Frames with a NaN IoU are skipped, and do not count.
+
+    Returns:
+    tuple: The 0-based first frame and the length of each failure. The length
+    of a recovered failure is its recovery latency.
+    """
+    starts, lengths, *_ = _failures(
+        numpy.asarray(ious, numpy.float64), threshold, min_frames
+    )
+    return starts, lengths
+
+
+def count_vot_failures(ious, skip=VOT_SKIP):
+    """
+    Count failures the way VOT does, without re-initialization.
+
+    Parameters:
+    ious (numpy.ndarray): The per-frame IoU.
+    skip (int): Zero-overlap runs which start fewer than this many frames
+        after the previous run ends are part of the same failure.
+
+    Returns:
+    int: The number of failures.
+    """
+    ious = numpy.asarray(ious, numpy.float64)
+    positions = numpy.flatnonzero(~numpy.isnan(ious))
+    starts, lengths = run_lengths(ious[positions] <= 0.0)
+    if len(starts) == 0:
+        return 0
+    gaps = positions[starts[1:]] - (positions[starts + lengths - 1][:-1] + 1)
+    return 1 + int(numpy.count_nonzero(gaps >= skip))
+
+
+def analyze_failures(
+    ious, threshold=FAILURE_THRESHOLD, min_frames=FAILURE_FRAMES
+):
+    """
+    Summarize the failures of a tracker on one sequence.
+
+    Parameters:
+    ious (numpy.ndarray): The per-frame IoU.
+    threshold (float): The IoU below which a frame has lost the target.
+    min_frames (int): The fewest consecutive lost frames which are a failure.
+
+    Returns:
+    dict: The statistics in STATISTICS, "unrecovered", which is 1 if the last
+    failure has no later frame at or above the threshold, and "segments", a
+    list of [first frame, length, recovered] lists with 0-based first frames.
+    The failed fraction is the fraction of frames with ground truth which are
+    in a failure. The mean recovery is the mean length of the recovered
+    failures, in frames; it is NaN if no failure recovered.
+    """
+    ious = numpy.asarray(ious, numpy.float64)
+    starts, lengths, recovered, lost, valid_frames = _failures(
+        ious, threshold, min_frames
+    )
+    return {
+        "failures": len(starts),
+        "failed_fraction": (
+            float(lost / valid_frames) if valid_frames else 0.0
+        ),
+        "mean_recovery": (
+            float(lengths[recovered].mean()) if recovered.any() else numpy.nan
+        ),
+        "vot_failures": count_vot_failures(ious),
+        "unrecovered": int(not recovered.all()),
+        "segments": [
+            [int(s), int(n), bool(r)]
+            for s, n, r in zip(starts, lengths, recovered)
+        ],
+    }
+
+
+def summarize_sequences(summaries, trackers):
+    """
+    Build the per-sequence failure table.
+
+    Parameters:
+    summaries (dict): The per-sequence summaries, keyed by sequence name. Each
+        summary has an analyze_failures() result per tracker.
+    trackers (list): The tracker names.
+
+    Returns:
+    list: One dict per sequence, with the "sequence" name and a
+    "<tracker>_<statistic>" entry for each tracker and statistic, including
+    "unrecovered". The rows can be written with
+    attribute_statistics.write_summary().
+    """
+    return [
+        {
+            "sequence": sequence,
+            **{
+                f"{tracker}_{statistic}": summaries[sequence][tracker][
+                    statistic
+                ]
+                for tracker in trackers
+                for statistic in STATISTICS + ["unrecovered"]
+            },
+        }
+        for sequence in sorted(summaries)
+    ]
+
+
+def write_segments(filename, summaries, trackers):
+    """
+    Write every failure of every tracker to a CSV file.
+
+    Parameters:
+    filename (string): The path to the CSV file.
+    summaries (dict): The per-sequence summaries, keyed by sequence name. Each
+        summary has an analyze_failures() result per tracker, and a
+        "first_frame" image frame number.
+    trackers (list): The tracker names.
+    """
+    with open(filename, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            [
+                "sequence",
+                "tracker",
+                "first_frame",
+                "last_frame",
+                "frames",
+                "recovered",
+            ]
+        )
+        for sequence in sorted(summaries):
+            offset = summaries[sequence]["first_frame"]
+            for tracker in trackers:
+                for start, length, recovered in summaries[sequence][tracker][
+                    "segments"
+                ]:
+                    writer.writerow(
+                        [
+                            sequence,
+                            tracker,
+                            start + offset,
+                            start + offset + length - 1,
+                            length,
+                            int(recovered),
+                        ]
+                    )
+
+
+# ------------------------------------------------------------------------------
+#                                                      internal implementation
+# ------------------------------------------------------------------------------
+def _failures(ious, threshold, min_frames):
+    positions = numpy.flatnonzero(~numpy.isnan(ious))
+    starts, lengths = run_lengths(ious[positions] < threshold)
+    keep = lengths >= min_frames
+    starts = starts[keep]
+    ends = starts + lengths[keep]
+    recovered = ends < len(positions)
+    spans = (
+        numpy.where(
+            recovered,
+            positions[numpy.minimum(ends, len(positions) - 1)],
+            positions[ends - 1] + 1,
+        )
+        - positions[starts]
+    )
+    return (
+        positions[starts],
+        spans,
+        recovered,
+        int(lengths[keep].sum()),
+        len(positions),
+    )
@@ -0,0 +1,231 @@
+"""
+Export per-frame metrics as columns for downstream analysis.
+
+An export is a directory with one NumPy .npy file per column, and a
+metadata.json file. Row i of every column describes one frame of one tracker
+on one sequence:
+
+    tracker       uint8    An index into the "trackers" metadata list.
+    sequence      uint16   An index into the "sequences" metadata list.
+    frame         int32    The image frame number.
+    iou           float32  NaN where the ground truth is missing.
+    center_error  float32  NaN where the ground truth is missing.
+    attributes    uint16   Bit i is set if the sequence has attribute i of the
+                           "attributes" metadata list.
+
+Rows are streamed to the column files one sequence at a time, so memory use
+does not grow with the size of the export. Each column file starts with a
+fixed-size .npy header, which is rewritten with the final row count when the
+export is closed. The columns are read with numpy.load(mmap_mode="r"), so
+reading an export copies nothing until the values are used, and the columns
+can be handed to pandas.DataFrame() as they are.
+"""
+
+import json
+import os.path
+
+import numpy
+
+from . import data_sets
+
+EXPORT_VERSION = 1
+"""int: The version of the export metadata."""
+
+METADATA = "metadata.json"
+"""string: The name of the export's metadata file."""
+
+COLUMNS = {
+    "tracker": numpy.dtype("<u1"),
+    "sequence": numpy.dtype("<u2"),
+    "frame": numpy.dtype("<i4"),
+    "iou": numpy.dtype("<f4"),
+    "center_error": numpy.dtype("<f4"),
+    "attributes": numpy.dtype("<u2"),
+}
+"""dict: The data type of each column, in column order."""
+
+_HEADER_SIZE = 128
+_PARTIAL = ".partial"
+
+
+class MetricsWriter:
+    """Stream per-frame metrics into a columnar export."""
+
+    def __init__(self, directory, trackers):
+        """
+        Start an export. The directory is created if it does not exist. Until
+        close() is called, the column files have a .partial suffix.
+
+        Parameters:
+        directory (string): The export directory.
+        trackers (list): The tracker names.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.trackers = list(trackers)
+        self.sequences = []
+        self.rows = 0
+        self._files = {}
+        for column, dtype in COLUMNS.items():
+            filename = self._path(column) + _PARTIAL
+            f = open(filename, "wb")  # pylint: disable=R1732
+            f.write(_make_header(dtype, 0))
+            self._files[column] = f
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        if exception_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def append(
+        self, tracker, sequence, ious, center_errors, attributes, first_frame=1
+    ):
+        """
+        Append the frames of one tracker on one sequence.
+
+        Parameters:
+        tracker (string): The tracker name. It must be one of the trackers
+            given to the constructor.
+        sequence (string): The sequence name.
+        ious (numpy.ndarray): The per-frame IoU.
+        center_errors (numpy.ndarray): The per-frame center errors.
+        attributes (list): The sequence's attribute names, or None.
+        first_frame (int): The image frame number of the first frame.
+        """
+        if sequence not in self.sequences:
+            self.sequences.append(sequence)
+        count = len(ious)
+        values = {
+            "tracker": self.trackers.index(tracker),
+            "sequence": self.sequences.index(sequence),
+            "frame": numpy.arange(first_frame, first_frame + count),
+            "iou": ious,
+            "center_error": center_errors,
+            "attributes": attribute_flags(attributes),
+        }
+        for column, dtype in COLUMNS.items():
+            numpy.broadcast_to(
+                numpy.asarray(values[column], dtype), (count,)
+            ).tofile(self._files[column])
+        self.rows += count
+
+    def close(self):
+        """
+        Finish the export. The column headers are rewritten with the row
+        count, the metadata is written, and the column files are renamed to
+        their final names.
+        """
+        for column, f in self._files.items():
+            f.seek(0)
+            f.write(_make_header(COLUMNS[column], self.rows))
+            f.close()
+            os.replace(f.name, self._path(column))
+        with open(os.path.join(self.directory, METADATA), "w") as f:
+            json.dump(
+                {
+                    "version": EXPORT_VERSION,
+                    "rows": self.rows,
+                    "columns": list(COLUMNS),
+                    "trackers": self.trackers,
+                    "sequences": self.sequences,
+                    "attributes": data_sets.ATTRIBUTES,
+                },
+                f,
+                indent=2,
+            )
+        self._files = {}
+
+    def abort(self):
+        """Stop the export, and remove the partial column files."""
+        for f in self._files.values():
+            f.close()
+            os.unlink(f.name)
+        self._files = {}
+
+    def _path(self, column):
+        return os.path.join(self.directory, f"{column}.npy")
+
+
+def attribute_flags(attributes):
+    """
+    Pack a sequence's attributes into a bit mask.
+
+    Parameters:
+    attributes (list): The attribute names, or None. Names which are not in
+        data_sets.ATTRIBUTES are ignored.
+
+    Returns:
+    int: The mask. Bit i is set if the sequence has data_sets.ATTRIBUTES[i].
+    """
+    return sum(
+        1 << index
+        for index, attribute in enumerate(data_sets.ATTRIBUTES)
+        if attribute in (attributes or ())
+    )
+
+
+def read_metrics(directory):
+    """
+    Read a columnar export.
+
+    Parameters:
+    directory (string): The export directory.
+
+    Returns:
+    tuple: A dict of read-only, memory mapped columns, and the metadata dict.
+    """
+    with open(os.path.join(directory, METADATA)) as f:
+        metadata = json.load(f)
+    if metadata["version"] != EXPORT_VERSION:
+        raise ValueError(
+            f"{directory} is export version {metadata['version']}, expected "
+            f"{EXPORT_VERSION}"
+        )
+    columns = {
+        column: numpy.load(
+            os.path.join(directory, f"{column}.npy"), mmap_mode="r"
+        )
+        for column in metadata["columns"]
+    }
+    return columns, metadata
+
+
+def has_attribute(columns, metadata, attribute):
+    """
+    Find the rows of an export whose sequence has an attribute.
+
+    Parameters:
+    columns (dict): The columns returned by read_metrics().
+    metadata (dict): The metadata returned by read_metrics().
+    attribute (string): The attribute name.
+
+    Returns:
+    numpy.ndarray: A boolean mask of the rows.
+    """
+    bit = 1 << metadata["attributes"].index(attribute)
+    return (columns["attributes"] & bit) != 0
+
+
+# ------------------------------------------------------------------------------
+#                                                      internal implementation
+# ------------------------------------------------------------------------------
+def _make_header(dtype, rows):
+    text = repr(
+        {
+            "descr": numpy.lib.format.dtype_to_descr(dtype),
+            "fortran_order": False,
+            "shape": (rows,),
+        }
+    )
+    preamble = numpy.lib.format.magic(1, 0)
+    size = _HEADER_SIZE - len(preamble) - 2
+    return (
+        preamble
+        + size.to_bytes(2, "little")
+        + text.ljust(size - 1).encode("latin1")
+        + b"\n"
+    )
@@ -0,0 +1,102 @@
+"""
+Render per-frame IoU graphs.
+
+The graphs use matplotlib's object-oriented Figure and Agg canvas instead of
+the pyplot state machine. One IoU graph is created and its line data is
+replaced for each sequence, so the figure, axes, and artists are built only
+once per process.
+
+matplotlib is imported when the first graph or PDF is created, so commands
+which do not render never pay its import time.
+"""
+
+FORMATS = ["svg", "png"]
+"""list: The supported file formats for per-sequence graphs."""
+
+
+class IouGraph:
+    """A graph of control and experimental IoU for one sequence at a time."""
+
+    def __init__(self):
+        """Create the figure and the artists for the graph."""
+        # pylint: disable=import-outside-toplevel
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        import matplotlib.figure
+
+        self.figure = matplotlib.figure.Figure()
+        FigureCanvasAgg(self.figure)
+        self._axes = self.figure.add_subplot()
+        (self._control_points,) = self._axes.plot([], [], "b.", label="control")
+        self._control_mean = self._axes.axhline(y=0.0, color="blue")
+        (self._experimental_points,) = self._axes.plot(
+            [], [], "r.", label="experimental"
+        )
+        self._experimental_mean = self._axes.axhline(y=0.0, color="red")
+        self._axes.set_ylabel("Overlap")
+        self._axes.set_xlabel("Frame")
+        self._axes.legend(
+            handles=[self._control_points, self._experimental_points]
+        )
+        self._title = self.figure.suptitle("")
+
+    def update(
+        self,
+        sequence,
+        control_ious,
+        control_mean,
+        experimental_ious,
+        experimental_mean,
+    ):
+        """
+        Replace the data in the graph.
+
+        Parameters:
+        sequence (string): The name of the sequence, used as the title.
+        control_ious (numpy.ndarray): The per-frame control IoU.
+        control_mean (float): The mean control IoU.
+        experimental_ious (numpy.ndarray): The per-frame experimental IoU.
+        experimental_mean (float): The mean experimental IoU.
+        """
+        self._title.set_text(sequence)
+        self._control_points.set_data(range(len(control_ious)), control_ious)
+        self._control_mean.set_ydata([control_mean, control_mean])
+        self._experimental_points.set_data(
+            range(len(experimental_ious)), experimental_ious
+        )
+        self._experimental_mean.set_ydata(
+            [experimental_mean, experimental_mean]
+        )
+        self._axes.relim()
+        self._axes.autoscale_view()
+
+    def save(self, filename, file_format=None):
+        """
+        Write the graph to a file.
+
+        Parameters:
+        filename (string or PdfPages): The file to write. A PdfPages object
+            adds the graph as a new page.
+        file_format (string): The file format. If this is None, the format is
+            taken from the file name.
+        """
+        if hasattr(filename, "savefig"):
+            filename.savefig(self.figure)
+        else:
+            self.figure.savefig(filename, format=file_format)
+
+
+def open_multi_page(filename):
+    """
+    Open a multi-page PDF to hold the graphs for many sequences.
+
+    Parameters:
+    filename (string): The path to the PDF file.
+
+    Returns:
+    PdfPages: The PDF file. Pass it to IouGraph.save() to add a page, and close
+    it when all pages are added.
+    """
+    # pylint: disable=import-outside-toplevel
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    return PdfPages(filename)
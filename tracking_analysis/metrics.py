@@ -0,0 +1,521 @@
+"""
+Vectorized per-frame tracking metrics.
+
+Each metric is computed for every frame of a sequence in one call. The dataset
+variants concatenate all the sequences in a BoxSet, compute the metric in one
+call, and split the result back into sequences with an offsets array.
+
+Ground truth frames with NaN values produce NaN results. Frames in which both
+the ground truth and tracking boxes have zero area have no defined overlap, so
+their IoU is NaN. A zero area ground truth box with a non-empty tracking box
+has an IoU of 0.
+
+The per-sequence functions also accept the tracking boxes as a (K, N, 4) array,
+which scores K trackers against the same ground truth in one call.
+
+The OTB curves are built from a histogram of the per-frame values over the
+curve thresholds, so each curve takes one pass over the data regardless of how
+many thresholds it has. Frames with NaN values are excluded from the curves.
+"""
+
+import numpy
+
+from .bounding_boxes import HEIGHT, WIDTH, X, Y
+from . import bounding_boxes
+
+SUCCESS_THRESHOLDS = numpy.linspace(0.0, 1.0, 21)
+"""numpy.ndarray: The OTB IoU thresholds for the success curve."""
+
+PRECISION_THRESHOLDS = numpy.arange(0.0, 51.0)
+"""numpy.ndarray: The OTB center error thresholds, in pixels."""
+
+PRECISION_THRESHOLD = 20.0
+"""float: The center error threshold used to rank trackers by precision."""
+
+
+class OtbAccumulator:
+    """
+    Accumulate OTB statistics over a stream of sequences.
+
+    Only the curve counts and running sums are kept, so the per-frame data of
+    each sequence can be discarded after it is added.
+    """
+
+    def __init__(self):
+        """Create an empty accumulator."""
+        self.success_counts = numpy.zeros(len(SUCCESS_THRESHOLDS), numpy.int64)
+        self.precision_counts = numpy.zeros(
+            len(PRECISION_THRESHOLDS), numpy.int64
+        )
+        self.iou_frames = 0
+        self.error_frames = 0
+        self.iou_sum = 0.0
+        self.error_sum = 0.0
+
+    def add(self, ious, center_errors):
+        """
+        Add the per-frame metrics of one sequence.
+
+        Parameters:
+        ious (numpy.ndarray): The per-frame IoU.
+        center_errors (numpy.ndarray): The per-frame center errors.
+        """
+        successes, iou_frames = count_successes(ious)
+        precise, error_frames = count_precise_frames(center_errors)
+        self.success_counts += successes
+        self.precision_counts += precise
+        self.iou_frames += iou_frames
+        self.error_frames += error_frames
+        self.iou_sum += float(numpy.nansum(ious))
+        self.error_sum += float(numpy.nansum(center_errors))
+
+    @property
+    def success_curve(self):
+        """numpy.ndarray: The success curve over every added frame."""
+        return _rates(self.success_counts, self.iou_frames)
+
+    @property
+    def precision_curve(self):
+        """numpy.ndarray: The precision curve over every added frame."""
+        return _rates(self.precision_counts, self.error_frames)
+
+    @property
+    def mean_iou(self):
+        """float: The mean IoU over every added frame."""
+        return self.iou_sum / self.iou_frames if self.iou_frames else 0.0
+
+    @property
+    def mean_center_error(self):
+        """float: The mean center error over every added frame."""
+        return self.error_sum / self.error_frames if self.error_frames else 0.0
+
+
+def calculate_ious(ground_truth, tracking):
+    """
+    Calculate the intersection over union for each frame of a sequence.
+
+    Parameters:
+    ground_truth (BoxSequence): The ground truth bounding boxes.
+    tracking (BoxSequence): The tracking bounding boxes.
+
+    Returns:
+    numpy.ndarray: The IoU for each frame.
+
+    Raises:
+    ValueError: The sequences have different lengths.
+    """
+    return _ious(*_boxes_of(ground_truth, tracking))
+
+
+def calculate_center_errors(ground_truth, tracking):
+    """
+    Calculate the center error for each frame of a sequence.
+
+    The center error is the Euclidean distance, in pixels, between the center of
+    the ground truth box and the center of the tracking box.
+
+    Parameters:
+    ground_truth (BoxSequence): The ground truth bounding boxes.
+    tracking (BoxSequence): The tracking bounding boxes.
+
+    Returns:
+    numpy.ndarray: The center error for each frame.
+
+    Raises:
+    ValueError: The sequences have different lengths.
+    """
+    return _center_errors(*_boxes_of(ground_truth, tracking))
+
+
+def calculate_normalized_center_errors(ground_truth, tracking):
+    """
+    Calculate the normalized center error for each frame of a sequence.
+
+    The offset between the box centers is divided by the ground truth width and
+    height before the distance is calculated. Frames with a zero width or zero
+    height ground truth box have a NaN error.
+
+    Parameters:
+    ground_truth (BoxSequence): The ground truth bounding boxes.
+    tracking (BoxSequence): The tracking bounding boxes.
+
+    Returns:
+    numpy.ndarray: The normalized center error for each frame.
+
+    Raises:
+    ValueError: The sequences have different lengths.
+    """
+    return _normalized_center_errors(*_boxes_of(ground_truth, tracking))
+
+
+def calculate_dataset_ious(ground_truth, tracking):
+    """
+    Calculate the per-frame IoU for every sequence in a data set.
+
+    Parameters:
+    ground_truth (BoxSet): The ground truth data set.
+    tracking (BoxSet): The tracking data set. Only sequences which are also in
+        the ground truth are used.
+
+    Returns:
+    dict: The per-frame IoU array for each sequence, keyed by sequence name.
+    """
+    return _calculate_dataset_metric(_ious, ground_truth, tracking)
+
+
+def calculate_dataset_center_errors(ground_truth, tracking):
+    """
+    Calculate the per-frame center error for every sequence in a data set.
+
+    Parameters:
+    ground_truth (BoxSet): The ground truth data set.
+    tracking (BoxSet): The tracking data set. Only sequences which are also in
+        the ground truth are used.
+
+    Returns:
+    dict: The per-frame center error array for each sequence, keyed by
+    sequence name.
+    """
+    return _calculate_dataset_metric(_center_errors, ground_truth, tracking)
+
+
+def calculate_dataset_normalized_center_errors(ground_truth, tracking):
+    """
+    Calculate the per-frame normalized center error for a data set.
+
+    Parameters:
+    ground_truth (BoxSet): The ground truth data set.
+    tracking (BoxSet): The tracking data set. Only sequences which are also in
+        the ground truth are used.
+
+    Returns:
+    dict: The per-frame normalized center error array for each sequence, keyed
+    by sequence name.
+    """
+    return _calculate_dataset_metric(
+        _normalized_center_errors, ground_truth, tracking
+    )
+
+
+def calculate_success_curve(ious, thresholds=SUCCESS_THRESHOLDS):
+    """
+    Calculate an OTB success curve.
+
+    The success rate at a threshold is the fraction of frames with an IoU
+    greater than the threshold.
+
+    Parameters:
+    ious (array-like): The per-frame IoU values. These can be from one
+        sequence, or concatenated from many sequences.
+    thresholds (numpy.ndarray): The sorted IoU thresholds.
+
+    Returns:
+    numpy.ndarray: The success rate at each threshold.
+    """
+    counts, total = count_successes(ious, thresholds)
+    return _rates(counts, total)
+
+
+def calculate_precision_curve(errors, thresholds=PRECISION_THRESHOLDS):
+    """
+    Calculate an OTB precision curve.
+
+    The precision at a threshold is the fraction of frames with a center error
+    less than or equal to the threshold.
+
+    Parameters:
+    errors (array-like): The per-frame center errors. These can be from one
+        sequence, or concatenated from many sequences.
+    thresholds (numpy.ndarray): The sorted center error thresholds.
+
+    Returns:
+    numpy.ndarray: The precision at each threshold.
+    """
+    counts, total = count_precise_frames(errors, thresholds)
+    return _rates(counts, total)
+
+
+def count_successes(ious, thresholds=SUCCESS_THRESHOLDS):
+    """
+    Count the frames with an IoU greater than each threshold.
+
+    Parameters:
+    ious (array-like): The per-frame IoU values.
+    thresholds (numpy.ndarray): The sorted IoU thresholds.
+
+    Returns:
+    tuple: An array with the number of successful frames at each threshold,
+    and the number of valid frames.
+    """
+    histogram, total = _histogram(ious, thresholds, "left")
+    return total - numpy.cumsum(histogram)[:-1], total
+
+
+def count_precise_frames(errors, thresholds=PRECISION_THRESHOLDS):
+    """
+    Count the frames with a center error at or below each threshold.
+
+    Parameters:
+    errors (array-like): The per-frame center errors.
+    thresholds (numpy.ndarray): The sorted center error thresholds.
+
+    Returns:
+    tuple: An array with the number of precise frames at each threshold, and
+    the number of valid frames.
+    """
+    histogram, total = _histogram(errors, thresholds, "left")
+    return numpy.cumsum(histogram)[:-1], total
+
+
+def calculate_grouped_means(values, offsets):
+    """
+    Average consecutive groups of per-frame values, ignoring NaN values.
+
+    Parameters:
+    values (numpy.ndarray): The per-frame values, with frames along the last
+        axis. Leading axes, such as one per tracker, are kept.
+    offsets (numpy.ndarray): The group boundaries. Group i is frames
+        offsets[i] to offsets[i + 1].
+
+    Returns:
+    numpy.ndarray: The mean of each group, with shape (..., G). A group with
+    no valid values has a mean of NaN.
+    """
+    values = numpy.asarray(values, dtype=numpy.float64)
+    valid = ~numpy.isnan(values)
+    sums = _grouped_sums(numpy.where(valid, values, 0.0), offsets)
+    counts = _grouped_sums(valid.astype(numpy.float64), offsets)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        return numpy.where(counts > 0, sums / counts, numpy.nan)
+
+
+def calculate_grouped_success_curves(
+    ious, offsets, thresholds=SUCCESS_THRESHOLDS
+):
+    """
+    Calculate a success curve for each consecutive group of frames.
+
+    All the curves come from one histogram pass over every frame.
+
+    Parameters:
+    ious (numpy.ndarray): The per-frame IoU, with frames along the last axis.
+        Leading axes, such as one per tracker, are kept.
+    offsets (numpy.ndarray): The group boundaries. Group i is frames
+        offsets[i] to offsets[i + 1].
+    thresholds (numpy.ndarray): The sorted IoU thresholds.
+
+    Returns:
+    numpy.ndarray: The success curves, with shape (..., G, T).
+    """
+    histogram = _grouped_histogram(ious, offsets, thresholds)
+    totals = histogram.sum(axis=-1, keepdims=True)
+    return _grouped_rates(
+        totals - numpy.cumsum(histogram, axis=-1)[..., :-1], totals
+    )
+
+
+def calculate_grouped_precision_curves(
+    errors, offsets, thresholds=PRECISION_THRESHOLDS
+):
+    """
+    Calculate a precision curve for each consecutive group of frames.
+
+    All the curves come from one histogram pass over every frame.
+
+    Parameters:
+    errors (numpy.ndarray): The per-frame center errors, with frames along the
+        last axis. Leading axes, such as one per tracker, are kept.
+    offsets (numpy.ndarray): The group boundaries. Group i is frames
+        offsets[i] to offsets[i + 1].
+    thresholds (numpy.ndarray): The sorted center error thresholds.
+
+    Returns:
+    numpy.ndarray: The precision curves, with shape (..., G, T).
+    """
+    histogram = _grouped_histogram(errors, offsets, thresholds)
+    totals = histogram.sum(axis=-1, keepdims=True)
+    return _grouped_rates(numpy.cumsum(histogram, axis=-1)[..., :-1], totals)
+
+
+def calculate_auc(success_curve):
+    """
+    Calculate the area under a success curve.
+
+    Parameters:
+    success_curve (numpy.ndarray): The success rates, evaluated at evenly
+        spaced thresholds from 0 to 1.
+
+    Returns:
+    float: The area under the curve, which OTB reports as the success score.
+    """
+    return float(numpy.mean(success_curve)) if len(success_curve) else 0.0
+
+
+def precision_at(
+    precision_curve,
+    threshold=PRECISION_THRESHOLD,
+    thresholds=PRECISION_THRESHOLDS,
+):
+    """
+    Look up the precision at one threshold.
+
+    Parameters:
+    precision_curve (numpy.ndarray): The precision curve.
+    threshold (float): The center error threshold to look up.
+    thresholds (numpy.ndarray): The thresholds the curve was evaluated at.
+
+    Returns:
+    float: The precision at the threshold.
+    """
+    return float(precision_curve[numpy.searchsorted(thresholds, threshold)])
+
+
+def concatenate(box_set, sequences):
+    """
+    Concatenate the boxes of several sequences into one array.
+
+    Parameters:
+    box_set (BoxSet): The data set that contains the sequences.
+    sequences (list): The names of the sequences to concatenate, in order.
+
+    Returns:
+    tuple: An (M, 4) array with every box, and an offsets array. The boxes for
+    sequences[i] are rows offsets[i] to offsets[i + 1].
+    """
+    lengths = [len(box_set[sequence]) for sequence in sequences]
+    offsets = numpy.zeros(len(sequences) + 1, dtype=numpy.int64)
+    numpy.cumsum(lengths, out=offsets[1:])
+    if not sequences:
+        return numpy.empty((0, 4)), offsets
+    return (
+        numpy.concatenate([box_set[sequence].boxes for sequence in sequences]),
+        offsets,
+    )
+
+
+# ------------------------------------------------------------------------------
+#                                                      internal implementation
+# ------------------------------------------------------------------------------
+def _boxes_of(ground_truth, tracking):
+    ground_truth = _as_array(ground_truth)
+    tracking = _as_array(tracking)
+    if ground_truth.shape[-2] != tracking.shape[-2]:
+        raise ValueError(
+            f"ground truth has {ground_truth.shape[-2]} frames, but tracking "
+            f"data has {tracking.shape[-2]} frames"
+        )
+    return ground_truth, tracking
+
+
+def _as_array(boxes):
+    if isinstance(boxes, bounding_boxes.BoxSequence):
+        return boxes.boxes
+    boxes = numpy.asarray(boxes, dtype=numpy.float64)
+    if boxes.ndim < 2:
+        return boxes.reshape(-1, 4)
+    return boxes
+
+
+def _calculate_dataset_metric(kernel, ground_truth, tracking):
+    sequences = [s for s in ground_truth if s in tracking]
+    for sequence in sequences:
+        if len(ground_truth[sequence]) != len(tracking[sequence]):
+            raise ValueError(
+                f"{sequence}: ground truth has {len(ground_truth[sequence])} "
+                f"frames, but tracking data has {len(tracking[sequence])} "
+                "frames"
+            )
+    gt_boxes, offsets = concatenate(ground_truth, sequences)
+    tracking_boxes, _ = concatenate(tracking, sequences)
+    values = kernel(gt_boxes, tracking_boxes)
+    return dict(zip(sequences, numpy.split(values, offsets[1:-1])))
+
+
+def _histogram(values, thresholds, side):
+    values = numpy.asarray(values, dtype=numpy.float64).ravel()
+    values = values[~numpy.isnan(values)]
+    bins = numpy.searchsorted(thresholds, values, side=side)
+    return numpy.bincount(bins, minlength=len(thresholds) + 1), len(values)
+
+
+def _grouped_sums(values, offsets):
+    lengths = numpy.diff(offsets)
+    sums = numpy.zeros(values.shape[:-1] + (len(lengths),))
+    non_empty = lengths > 0
+    if non_empty.any():
+        sums[..., non_empty] = numpy.add.reduceat(
+            values, offsets[:-1][non_empty], axis=-1
+        )
+    return sums
+
+
+def _grouped_histogram(values, offsets, thresholds):
+    values = numpy.asarray(values, dtype=numpy.float64)
+    leading_shape = values.shape[:-1]
+    values = values.reshape(-1, values.shape[-1])
+    group_count = len(offsets) - 1
+    bin_count = len(thresholds) + 1
+    groups = numpy.repeat(numpy.arange(group_count), numpy.diff(offsets))
+    rows = numpy.arange(values.shape[0])[:, numpy.newaxis]
+    indices = (rows * group_count + groups) * bin_count + numpy.searchsorted(
+        thresholds, values, side="left"
+    )
+    histogram = numpy.bincount(
+        indices[~numpy.isnan(values)],
+        minlength=values.shape[0] * group_count * bin_count,
+    )
+    return histogram.reshape(leading_shape + (group_count, bin_count))
+
+
+def _grouped_rates(counts, totals):
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        return numpy.where(totals > 0, counts / totals, 0.0)
+
+
+def _rates(counts, total):
+    if total == 0:
+        return numpy.zeros(len(counts))
+    return counts / total
+
+
+def _ious(gt, tracking):  # pylint: disable=C0103
+    left = numpy.maximum(gt[..., X], tracking[..., X])
+    right = numpy.minimum(
+        gt[..., X] + gt[..., WIDTH], tracking[..., X] + tracking[..., WIDTH]
+    )
+    top = numpy.maximum(gt[..., Y], tracking[..., Y])
+    bottom = numpy.minimum(
+        gt[..., Y] + gt[..., HEIGHT], tracking[..., Y] + tracking[..., HEIGHT]
+    )
+    intersection = numpy.clip(right - left, 0, None) * numpy.clip(
+        bottom - top, 0, None
+    )
+    union = (
+        gt[..., WIDTH] * gt[..., HEIGHT]
+        + tracking[..., WIDTH] * tracking[..., HEIGHT]
+        - intersection
+    )
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        return numpy.where(union > 0, intersection / union, numpy.nan)
+
+
+def _center_offsets(gt, tracking):  # pylint: disable=C0103
+    return (tracking[..., X:WIDTH] + 0.5 * tracking[..., WIDTH:]) - (
+        gt[..., X:WIDTH] + 0.5 * gt[..., WIDTH:]
+    )
+
+
+def _center_errors(gt, tracking):  # pylint: disable=C0103
+    offsets = _center_offsets(gt, tracking)
+    return numpy.hypot(offsets[..., 0], offsets[..., 1])
+
+
+def _normalized_center_errors(gt, tracking):  # pylint: disable=C0103
+    sizes = gt[..., WIDTH:]
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        offsets = numpy.where(
+            (sizes > 0).all(axis=-1, keepdims=True),
+            _center_offsets(gt, tracking) / sizes,
+            numpy.nan,
+        )
+    return numpy.hypot(offsets[..., 0], offsets[..., 1])
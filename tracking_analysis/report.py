@@ -0,0 +1,374 @@
+"""
+Write an analysis run as one HTML report and one JSON summary.
+
+The HTML report is self-contained: the per-sequence statistics and the
+downsampled per-frame IoU of each tracker are embedded in the page, and the
+page draws the graphs and filters sequences by attribute and outcome in the
+browser. This replaces a graph file per sequence and a directory of symbolic
+links per attribute and outcome.
+"""
+
+import html
+import json
+import math
+import string
+import time
+
+import numpy
+
+REPORT_VERSION = 1
+"""int: The version of the report and summary documents."""
+
+MAX_POINTS = 400
+"""int: The most points kept from each per-frame series."""
+
+
+def downsample(values, points=MAX_POINTS):
+    """
+    Reduce a per-frame series to at most a number of points.
+
+    The frames are split into equal buckets, and each bucket is replaced by the
+    mean of its valid values. A bucket with no valid values is NaN.
+
+    Parameters:
+    values (numpy.ndarray): The per-frame values.
+    points (int): The most points to keep.
+
+    Returns:
+    tuple: The first frame of each bucket, and the bucket means.
+    """
+    values = numpy.asarray(values, numpy.float64)
+    if len(values) <= points:
+        return numpy.arange(len(values)), values
+    starts = numpy.linspace(0, len(values), points, endpoint=False).astype(
+        numpy.int64
+    )
+    valid = ~numpy.isnan(values)
+    totals = numpy.add.reduceat(numpy.where(valid, values, 0.0), starts)
+    counts = numpy.add.reduceat(valid.astype(numpy.int64), starts)
+    with numpy.errstate(invalid="ignore"):
+        return starts, numpy.where(counts > 0, totals / counts, numpy.nan)
+
+
+def make_series(values, points=MAX_POINTS):
+    """
+    Downsample a per-frame series for a report.
+
+    Parameters:
+    values (numpy.ndarray): The per-frame values.
+    points (int): The most points to keep.
+
+    Returns:
+    dict: The "frames" and rounded "values" lists, and the original "length".
+    NaN values are None.
+    """
+    frames, means = downsample(values, points)
+    return {
+        "length": len(values),
+        "frames": frames.tolist(),
+        "values": [
+            None if math.isnan(v) else round(v, 4) for v in means.tolist()
+        ],
+    }
+
+
+def make_document(title, trackers, summaries, attribute_rows):
+    """
+    Build the report document.
+
+    Parameters:
+    title (string): The report title.
+    trackers (list): The tracker names.
+    summaries (dict): The per-sequence summaries, keyed by sequence. Each has
+        "attributes", a dict of statistics per tracker, an optional
+        "comparison" with an "outcome", and an optional "series" dict with a
+        make_series() result per tracker.
+    attribute_rows (list): The rows from
+        attribute_statistics.summarize_attributes().
+
+    Returns:
+    dict: The document. It contains only JSON values; NaN is None.
+    """
+    return _finite(
+        {
+            "version": REPORT_VERSION,
+            "title": title,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "trackers": trackers,
+            "sequences": [
+                {"name": sequence, **summaries[sequence]}
+                for sequence in sorted(summaries)
+            ],
+            "attributes": attribute_rows,
+        }
+    )
+
+
+def write_summary(filename, document):
+    """
+    Write the report document, without per-frame series, to a JSON file.
+
+    Parameters:
+    filename (string): The path to the JSON file.
+    document (dict): The document from make_document().
+    """
+    summary = dict(document)
+    summary["sequences"] = [
+        {key: value for key, value in entry.items() if key != "series"}
+        for entry in document["sequences"]
+    ]
+    with open(filename, "w") as f:
+        json.dump(summary, f, indent=2)
+
+
+def write_html(filename, document):
+    """
+    Write the report document to a self-contained HTML file.
+
+    Parameters:
+    filename (string): The path to the HTML file.
+    document (dict): The document from make_document().
+    """
+    data = json.dumps(document, separators=(",", ":")).replace("</", "<\\/")
+    with open(filename, "w") as f:
+        f.write(
+            _TEMPLATE.substitute(
+                title=html.escape(document["title"]), data=data
+            )
+        )
+
+
+# ------------------------------------------------------------------------------
+#                                                      internal implementation
+# ------------------------------------------------------------------------------
+def _finite(value):
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    if isinstance(value, (float, numpy.floating)):
+        return None if math.isnan(value) else float(value)
+    if isinstance(value, numpy.integer):
+        return int(value)
+    return value
+
+
+_TEMPLATE = string.Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>$title</title>
+<style>
+body { font-family: sans-serif; margin: 1em 2em; }
+table { border-collapse: collapse; }
+th, td { padding: 2px 8px; text-align: right; border-bottom: 1px solid #ddd; }
+th { cursor: pointer; background: #f4f4f4; }
+td.name, th.name, td.tags { text-align: left; }
+td.tags { font-size: smaller; color: #555; }
+.better { color: #070; } .worse { color: #a00; } .no_difference { color: #777; }
+#controls > * { margin-right: 1.5em; }
+svg.graph { background: #fafafa; }
+</style>
+</head>
+<body>
+<h1>$title</h1>
+<div id="controls">
+<label>Attribute <select id="attribute"></select></label>
+<span id="outcomes"></span>
+<label>Sequence <input id="search" type="search"></label>
+<span id="count"></span>
+</div>
+<h2>Sequences</h2>
+<table id="sequences"><thead></thead><tbody></tbody></table>
+<h2>Attributes</h2>
+<table id="attributes"><thead></thead><tbody></tbody></table>
+<script type="application/json" id="data">$data</script>
+<script>
+"use strict";
+const data = JSON.parse(document.getElementById("data").textContent);
+const colors = ["#1f4fd0", "#d02020", "#20a040", "#a040c0", "#d08020"];
+const statistics = ["mean_iou", "auc", "precision"];
+const SVG = "http://www.w3.org/2000/svg";
+let sortKey = "name";
+let sortDescending = false;
+
+function element(tag, text, className) {
+  const node = document.createElement(tag);
+  if (text !== undefined) node.textContent = text;
+  if (className) node.className = className;
+  return node;
+}
+
+function format(value) {
+  return value === null || value === undefined ? "" : value.toFixed(3);
+}
+
+function outcomeOf(entry) {
+  return entry.comparison ? entry.comparison.outcome : "";
+}
+
+function graph(entry) {
+  const width = 320, height = 60;
+  const svg = document.createElementNS(SVG, "svg");
+  svg.setAttribute("class", "graph");
+  svg.setAttribute("width", width);
+  svg.setAttribute("height", height);
+  data.trackers.forEach(function (tracker, index) {
+    const series = entry.series && entry.series[tracker];
+    if (!series || series.length === 0) return;
+    const points = [];
+    series.values.forEach(function (value, i) {
+      if (value === null) return;
+      const x = (series.frames[i] / Math.max(series.length - 1, 1)) * width;
+      points.push(x.toFixed(1) + "," + ((1 - value) * height).toFixed(1));
+    });
+    const line = document.createElementNS(SVG, "polyline");
+    line.setAttribute("points", points.join(" "));
+    line.setAttribute("fill", "none");
+    line.setAttribute("stroke", colors[index % colors.length]);
+    line.setAttribute("stroke-width", "1");
+    svg.appendChild(line);
+  });
+  return svg;
+}
+
+function sortValue(entry, key) {
+  if (key === "name") return entry.name;
+  if (key === "outcome") return outcomeOf(entry);
+  const parts = key.split("/");
+  const value = entry[parts[0]] && entry[parts[0]][parts[1]];
+  return value === null || value === undefined ? -Infinity : value;
+}
+
+function header(table, columns) {
+  const row = element("tr");
+  columns.forEach(function (column) {
+    const cell = element("th", column.label, column.key === "name" ? "name" : "");
+    if (column.sortable) {
+      cell.onclick = function () {
+        sortDescending = sortKey === column.key ? !sortDescending : false;
+        sortKey = column.key;
+        render();
+      };
+    }
+    row.appendChild(cell);
+  });
+  table.tHead.replaceChildren(row);
+}
+
+function sequenceColumns() {
+  const columns = [
+    { key: "name", label: "sequence", sortable: true },
+    { key: "outcome", label: "outcome", sortable: true },
+  ];
+  data.trackers.forEach(function (tracker) {
+    statistics.forEach(function (statistic) {
+      columns.push({
+        key: tracker + "/" + statistic,
+        label: tracker + " " + statistic,
+        sortable: true,
+      });
+    });
+  });
+  columns.push({ key: "graph", label: "IoU per frame" });
+  columns.push({ key: "attributes", label: "attributes" });
+  return columns;
+}
+
+function render() {
+  const attribute = document.getElementById("attribute").value;
+  const search = document.getElementById("search").value.toLowerCase();
+  const outcomes = new Set();
+  document.querySelectorAll("#outcomes input").forEach(function (box) {
+    if (box.checked) outcomes.add(box.value);
+  });
+  const entries = data.sequences.filter(function (entry) {
+    return (
+      (attribute === "" || (entry.attributes || []).includes(attribute)) &&
+      (outcomes.size === 0 || outcomes.has(outcomeOf(entry))) &&
+      entry.name.toLowerCase().includes(search)
+    );
+  });
+  entries.sort(function (a, b) {
+    const x = sortValue(a, sortKey), y = sortValue(b, sortKey);
+    const order = x < y ? -1 : x > y ? 1 : 0;
+    return sortDescending ? -order : order;
+  });
+  const table = document.getElementById("sequences");
+  header(table, sequenceColumns());
+  const rows = entries.map(function (entry) {
+    const row = element("tr");
+    row.appendChild(element("td", entry.name, "name"));
+    const outcome = outcomeOf(entry);
+    row.appendChild(element("td", outcome.replace("_", " "), outcome));
+    data.trackers.forEach(function (tracker) {
+      statistics.forEach(function (statistic) {
+        row.appendChild(element("td", format((entry[tracker] || {})[statistic])));
+      });
+    });
+    const cell = element("td");
+    cell.appendChild(graph(entry));
+    row.appendChild(cell);
+    row.appendChild(element("td", (entry.attributes || []).join(", "), "tags"));
+    return row;
+  });
+  table.tBodies[0].replaceChildren(...rows);
+  document.getElementById("count").textContent =
+    entries.length + " of " + data.sequences.length + " sequences";
+}
+
+function renderAttributes() {
+  const table = document.getElementById("attributes");
+  if (data.attributes.length === 0) return;
+  const keys = Object.keys(data.attributes[0]);
+  const row = element("tr");
+  keys.forEach(function (key) {
+    row.appendChild(element("th", key.replace("_", " "), key === "attribute" ? "name" : ""));
+  });
+  table.tHead.replaceChildren(row);
+  table.tBodies[0].replaceChildren(...data.attributes.map(function (entry) {
+    const row = element("tr");
+    keys.forEach(function (key) {
+      const value = entry[key];
+      row.appendChild(
+        typeof value === "number" && !Number.isInteger(value)
+          ? element("td", format(value))
+          : element("td", value === null ? "" : String(value), key === "attribute" ? "name" : "")
+      );
+    });
+    return row;
+  }));
+}
+
+function setUp() {
+  const select = document.getElementById("attribute");
+  select.appendChild(new Option("all", ""));
+  const attributes = new Set();
+  data.sequences.forEach(function (entry) {
+    (entry.attributes || []).forEach(function (a) { attributes.add(a); });
+  });
+  Array.from(attributes).sort().forEach(function (a) {
+    select.appendChild(new Option(a.replace(/_/g, " "), a));
+  });
+  const outcomes = new Set(data.sequences.map(outcomeOf).filter(Boolean));
+  const container = document.getElementById("outcomes");
+  Array.from(outcomes).sort().forEach(function (outcome) {
+    const label = element("label", " " + outcome.replace("_", " ") + " ", outcome);
+    const box = element("input");
+    box.type = "checkbox";
+    box.value = outcome;
+    box.onchange = render;
+    label.prepend(box);
+    container.appendChild(label);
+  });
+  select.onchange = render;
+  document.getElementById("search").oninput = render;
+  renderAttributes();
+  render();
+}
+
+setUp();
+</script>
+</body>
+</html>
+""")
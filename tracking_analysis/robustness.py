@@ -0,0 +1,352 @@
+"""
+Score OTB temporal and spatial robustness evaluations.
+
+Temporal robustness evaluation (TRE) runs a tracker once from each of several
+start frames spread through a sequence. Spatial robustness evaluation (SRE)
+runs it from the first frame with shifted and scaled initial boxes. Each
+sequence's result file is a JSON list of runs, each with a "res" list of
+boxes and an optional "startFrame". Start frames are image frame numbers, as in
+the OTB toolkit, so they start at 1, or at the first frame in
+data_sets.FRAME_RANGES.
+
+All runs of a sequence are scored in one batch: the ground truth rows for every
+run are gathered with one index array, and the IoU and center errors are
+calculated for every run at once. Sequences are spread across a process pool.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os.path
+import sys
+
+import numpy
+
+from . import analysis_tools
+from . import bounding_boxes
+from . import data_sets
+from . import dataset_index
+from . import metrics
+from . import to_otb
+
+__version__ = "0.0.0"
+
+EVALUATIONS = {"tre": "TRE", "sre": "SRE"}
+"""dict: The OTB evalType of each robustness evaluation."""
+
+TRE_SEGMENTS = 20
+"""int: The number of start frames in a temporal robustness evaluation."""
+
+SRE_PERTURBATIONS = [
+    ("left", -0.1, 0.0, 1.0),
+    ("right", 0.1, 0.0, 1.0),
+    ("up", 0.0, -0.1, 1.0),
+    ("down", 0.0, 0.1, 1.0),
+    ("top_left", -0.1, -0.1, 1.0),
+    ("top_right", 0.1, -0.1, 1.0),
+    ("bottom_left", -0.1, 0.1, 1.0),
+    ("bottom_right", 0.1, 0.1, 1.0),
+    ("scale_0.8", 0.0, 0.0, 0.8),
+    ("scale_0.9", 0.0, 0.0, 0.9),
+    ("scale_1.1", 0.0, 0.0, 1.1),
+    ("scale_1.2", 0.0, 0.0, 1.2),
+]
+"""
+list: The OTB spatial perturbations, in OTB order. Each is a name, the x and y
+shifts as fractions of the box size, and the scale about the box center.
+"""
+
+RUN_FILE = "result.json"
+"""string: The name of the file with a sequence's robustness runs."""
+
+
+def tre_start_frames(ground_truth, segments=TRE_SEGMENTS):
+    """
+    Choose the start frames of a temporal robustness evaluation.
+
+    The sequence is split into equal segments. A start frame whose ground
+    truth is missing or empty is moved to the next frame with a valid box.
+
+    Parameters:
+    ground_truth (BoxSequence): The ground truth for the sequence.
+    segments (int): The number of segments.
+
+    Returns:
+    numpy.ndarray: The distinct 0-based ground truth rows to start from.
+    """
+    count = len(ground_truth)
+    valid = numpy.isfinite(ground_truth.boxes).all(axis=1) & (
+        ground_truth.areas > 0.0
+    )
+    candidates = numpy.where(valid, numpy.arange(count), count)
+    next_valid = numpy.minimum.accumulate(candidates[::-1])[::-1]
+    starts = next_valid[numpy.arange(segments) * count // segments]
+    return numpy.unique(starts[starts < count])
+
+
+def sre_initial_boxes(box):
+    """
+    Make the perturbed initial boxes of a spatial robustness evaluation.
+
+    Parameters:
+    box (numpy.ndarray): The ground truth box in the first frame, as
+        [x, y, width, height].
+
+    Returns:
+    numpy.ndarray: A (12, 4) array with one box per entry in
+    SRE_PERTURBATIONS.
+    """
+    box = numpy.asarray(box, numpy.float64)
+    perturbations = numpy.array([p[1:] for p in SRE_PERTURBATIONS])
+    sizes = box[2:] * perturbations[:, 2:]
+    centers = box[:2] + box[2:] / 2.0 + perturbations[:, :2] * box[2:]
+    return numpy.hstack([centers - sizes / 2.0, sizes])
+
+
+def read_runs(filename, first_frame=1):
+    """
+    Read the runs of a robustness evaluation.
+
+    Parameters:
+    filename (string): The path to the JSON run file.
+    first_frame (int): The image frame number of the first ground truth row.
+
+    Returns:
+    list: One (start, BoxSequence) tuple per run. The start is the 0-based
+    ground truth row of the run's first box. None is returned if the file is
+    missing or malformed.
+    """
+    try:
+        with open(filename) as f:
+            document = json.load(f)
+        if isinstance(document, dict):
+            document = [document]
+        return [
+            (
+                int(run.get("startFrame", first_frame)) - first_frame,
+                bounding_boxes.BoxSequence(
+                    numpy.array(run["res"], numpy.float64)
+                ),
+            )
+            for run in document
+        ]
+    except FileNotFoundError:
+        print(f"error: {filename} does not exist")
+        return None
+    except (ValueError, KeyError, TypeError, AttributeError) as error:
+        print(f"error: {filename} is malformed: {error}")
+        return None
+
+
+def score_runs(ground_truth, runs):
+    """
+    Score every run of one sequence in one batch.
+
+    Parameters:
+    ground_truth (BoxSequence): The ground truth for the sequence.
+    runs (list): (start, BoxSequence) tuples, as returned by read_runs().
+
+    Returns:
+    tuple: The per-frame IoU and center errors of every run, concatenated, and
+    an offsets array. Run i is rows offsets[i] to offsets[i + 1].
+
+    Raises:
+    ValueError: A run starts before the ground truth, or extends past it.
+    """
+    lengths = numpy.array([len(boxes) for _, boxes in runs], numpy.int64)
+    starts = numpy.array([start for start, _ in runs], numpy.int64)
+    if numpy.any(starts < 0) or numpy.any(starts + lengths > len(ground_truth)):
+        raise ValueError(
+            f"runs must lie within the {len(ground_truth)} ground truth frames"
+        )
+    offsets = numpy.zeros(len(runs) + 1, numpy.int64)
+    numpy.cumsum(lengths, out=offsets[1:])
+    rows = numpy.arange(offsets[-1]) + numpy.repeat(
+        starts - offsets[:-1], lengths
+    )
+    gt_boxes = ground_truth.boxes[rows]
+    tracking_boxes = numpy.concatenate(
+        [boxes.boxes for _, boxes in runs] or [numpy.empty((0, 4))]
+    )
+    return (
+        metrics.calculate_ious(gt_boxes, tracking_boxes),
+        metrics.calculate_center_errors(gt_boxes, tracking_boxes),
+        offsets,
+    )
+
+
+def evaluate(ground_truth_root, result_root, sequences, evaluation, jobs=1):
+    """
+    Score a robustness evaluation of one tracker.
+
+    Parameters:
+    ground_truth_root (string): The root directory of the ground truth.
+    result_root (string): The root directory of the tracker's run files.
+    sequences (list): The sequences to score. If this is None, every sequence
+        in the result root is scored, sorted by name.
+    evaluation (string): A key of EVALUATIONS.
+    jobs (int): The number of worker processes.
+
+    Returns:
+    generator: (sequence, ious, center_errors) tuples for each sequence which
+    could be scored, in order. Pass it to to_otb.make_otb_data().
+    """
+    result_index = dataset_index.RootIndex(result_root, sequences)
+    if sequences is None:
+        sequences = result_index.sequences
+    ground_truth_index = dataset_index.RootIndex(ground_truth_root, sequences)
+    tasks = []
+    for sequence in sequences:
+        ground_truth_file = analysis_tools.find_bounding_box_file(
+            ground_truth_index, sequence, analysis_tools.GROUND_TRUTH_FILES
+        )
+        run_file = result_index.find(sequence, [RUN_FILE])
+        if ground_truth_file is None or run_file is None:
+            print(
+                f"warning: skipping {sequence}: the ground truth or {RUN_FILE} "
+                "is missing"
+            )
+            continue
+        tasks.append((sequence, ground_truth_file, run_file, evaluation))
+    if jobs == 1:
+        yield from filter(None, map(_score_sequence, tasks))
+        return
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        yield from filter(
+            None,
+            executor.map(
+                _score_sequence,
+                tasks,
+                chunksize=max(1, len(tasks) // (4 * jobs)),
+            ),
+        )
+
+
+# ------------------------------------------------------------------------------
+#                                                      internal implementation
+# ------------------------------------------------------------------------------
+def _expected_runs(evaluation, ground_truth):
+    if evaluation == "tre":
+        return len(tre_start_frames(ground_truth))
+    return len(SRE_PERTURBATIONS)
+
+
+def _score_sequence(task):
+    sequence, ground_truth_file, run_file, evaluation = task
+    ground_truth = analysis_tools.read_bounding_box_file(ground_truth_file)
+    first_frame = data_sets.FRAME_RANGES.get(sequence, (1, None))[0]
+    runs = read_runs(run_file, first_frame)
+    if ground_truth is None or runs is None:
+        return None
+    expected = _expected_runs(evaluation, ground_truth)
+    if len(runs) != expected:
+        print(f"warning: {sequence} has {len(runs)} runs, expected {expected}")
+    try:
+        ious, center_errors, _ = score_runs(ground_truth, runs)
+    except ValueError as error:
+        print(f"warning: skipping {sequence}: {error}")
+        return None
+    return sequence, ious, center_errors
+
+
+def _parse_arguments(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Score a TRE or SRE robustness evaluation, and write the "
+        "results for OTB.",
+    )
+    parser.add_argument(
+        "--version",
+        action="version",
+        version=__version__,
+        help="Display the version, and exit.",
+    )
+    parser.add_argument(
+        "--evaluation",
+        choices=sorted(EVALUATIONS),
+        default="tre",
+        help="The robustness evaluation to score.",
+    )
+    parser.add_argument(
+        "--experimental-root",
+        default="~/data/py-MDNet/results",
+        help="The root directory which contains the experimental sequence "
+        "data. This directory should have each sequence as a subdirectory. "
+        f"Within each sequence subdirectory should be a {RUN_FILE} file with "
+        "the runs of the evaluation.",
+        nargs="?",
+    )
+    parser.add_argument(
+        "--ground-truth-root",
+        default="~/Videos/otb",
+        help="The root directory which contains the ground truth sequence "
+        "data. This directory should have each sequence as a subdirectory. "
+        "Within each sequence subdirectory should be a file with the "
+        "ground truth bounding box data.",
+        nargs="?",
+    )
+    parser.add_argument(
+        "--output-root",
+        default=os.getcwd(),
+        help="The root directory to which the OTB file is written. The file "
+        "is named for the evaluation, such as tre.json.",
+        nargs="?",
+    )
+    parser.add_argument(
+        "--jobs",
+        default=1,
+        help="The number of worker processes used to score sequences.",
+        type=int,
+    )
+    parser.add_argument(
+        "sequences",
+        help="The sequences to score. If omitted, every sequence in the "
+        "experimental root is scored.",
+        nargs="*",
+    )
+    arguments = parser.parse_args(argv)
+    arguments.experimental_root = os.path.expanduser(
+        arguments.experimental_root
+    )
+    arguments.ground_truth_root = os.path.expanduser(
+        arguments.ground_truth_root
+    )
+    arguments.output_root = os.path.expanduser(arguments.output_root)
+    return arguments
+
+
+def main(argv=None, prog=None):
+    """
+    Score a TRE or SRE evaluation, and write the OTB file.
+
+    Parameters:
+    argv (list): The command line arguments. If this is None, sys.argv is
+        used.
+    prog (string): The program name shown in the usage message.
+    """
+    arguments = _parse_arguments(argv, prog)
+    if not os.path.isdir(arguments.experimental_root):
+        sys.exit(f"{arguments.experimental_root} is not a directory.")
+    if not os.path.isdir(arguments.ground_truth_root):
+        sys.exit(f"{arguments.ground_truth_root} is not a directory.")
+    if not os.path.isdir(arguments.output_root):
+        sys.exit(f"{arguments.output_root} is not a directory.")
+    if arguments.jobs < 1:
+        sys.exit("--jobs must be at least 1.")
+    analysis_tools.write_otb_data(
+        to_otb.make_otb_data(
+            evaluate(
+                arguments.ground_truth_root,
+                arguments.experimental_root,
+                sorted(arguments.sequences) or None,
+                arguments.evaluation,
+                arguments.jobs,
+            ),
+            EVALUATIONS[arguments.evaluation],
+        ),
+        os.path.join(arguments.output_root, f"{arguments.evaluation}.json"),
+    )
+
+
+if __name__ == "__main__":
+    main()
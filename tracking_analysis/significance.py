@@ -0,0 +1,235 @@
+"""
+Test whether one tracker is significantly better than another on a sequence.
+
+The tests are paired: frame i of the control is compared with frame i of the
+experimental tracker. Frames where either IoU is NaN are left out. Resampling
+tests draw every resample at once, as one matrix, in batches which bound the
+memory use.
+
+Consecutive frames are correlated, so these tests treat the frames as more
+independent than they are. A significant result on a short sequence is still
+weak evidence.
+"""
+
+import collections
+import math
+
+import numpy
+
+TESTS = ["bootstrap", "permutation", "wilcoxon"]
+"""list: The names of the paired tests."""
+
+BETTER = "better"
+WORSE = "worse"
+NO_DIFFERENCE = "no_difference"
+OUTCOMES = [BETTER, WORSE, NO_DIFFERENCE]
+"""list: The classifications of an experimental tracker against a control."""
+
+Comparison = collections.namedtuple(
+    "Comparison", ["difference", "low", "high", "p_value", "outcome"]
+)
+"""
+namedtuple: The result of a paired comparison. The difference is the mean of
+experimental minus control. The low and high values are the bootstrap
+confidence interval of the difference.
+"""
+
+_BATCH_ELEMENTS = 2**22
+
+
+def paired_differences(control, experimental):
+    """
+    Calculate the per-frame differences of two trackers.
+
+    Parameters:
+    control (numpy.ndarray): The per-frame values of the control tracker.
+    experimental (numpy.ndarray): The per-frame values of the experimental
+        tracker.
+
+    Returns:
+    numpy.ndarray: experimental - control, for frames where both are valid.
+    """
+    differences = numpy.asarray(experimental, numpy.float64) - numpy.asarray(
+        control, numpy.float64
+    )
+    return differences[~numpy.isnan(differences)]
+
+
+def bootstrap_means(values, resamples=10000, seed=0):
+    """
+    Calculate the means of bootstrap resamples.
+
+    Parameters:
+    values (numpy.ndarray): The values to resample.
+    resamples (int): The number of resamples.
+    seed (int): The random number generator seed.
+
+    Returns:
+    numpy.ndarray: The mean of each resample.
+    """
+    values = numpy.asarray(values, numpy.float64)
+    generator = numpy.random.default_rng(seed)
+    means = numpy.empty(resamples)
+    for start, stop in _batches(resamples, len(values)):
+        indices = generator.integers(
+            0, len(values), (stop - start, len(values))
+        )
+        means[start:stop] = values[indices].mean(axis=1)
+    return means
+
+
+def bootstrap_interval(values, confidence=0.95, resamples=10000, seed=0):
+    """
+    Calculate a percentile bootstrap confidence interval of a mean.
+
+    Parameters:
+    values (numpy.ndarray): The sample.
+    confidence (float): The confidence level of the interval.
+    resamples (int): The number of resamples.
+    seed (int): The random number generator seed.
+
+    Returns:
+    tuple: The low and high ends of the interval. Both are NaN if the sample is
+    empty.
+    """
+    if len(values) == 0:
+        return numpy.nan, numpy.nan
+    tail = (1.0 - confidence) / 2.0
+    low, high = numpy.quantile(
+        bootstrap_means(values, resamples, seed), [tail, 1.0 - tail]
+    )
+    return float(low), float(high)
+
+
+def permutation_test(differences, permutations=10000, seed=0):
+    """
+    Run a paired sign-flip permutation test on the mean difference.
+
+    Under the null hypothesis each paired difference is equally likely to have
+    either sign, so the signs are flipped at random for every permutation.
+
+    Parameters:
+    differences (numpy.ndarray): The paired differences.
+    permutations (int): The number of random permutations.
+    seed (int): The random number generator seed.
+
+    Returns:
+    float: The two-sided p-value.
+    """
+    differences = numpy.asarray(differences, numpy.float64)
+    if len(differences) == 0:
+        return 1.0
+    observed = abs(differences.mean())
+    generator = numpy.random.default_rng(seed)
+    extreme = 0
+    for start, stop in _batches(permutations, len(differences)):
+        signs = generator.integers(0, 2, (stop - start, len(differences)))
+        means = (signs * 2 - 1) @ differences / len(differences)
+        extreme += int(
+            numpy.count_nonzero(
+                numpy.abs(means) >= observed - 1e-12 * max(observed, 1.0)
+            )
+        )
+    return (extreme + 1) / (permutations + 1)
+
+
+def wilcoxon_test(differences):
+    """
+    Run a Wilcoxon signed-rank test with the normal approximation.
+
+    Zero differences are dropped. Tied ranks are averaged, and the variance is
+    corrected for them.
+
+    Parameters:
+    differences (numpy.ndarray): The paired differences.
+
+    Returns:
+    float: The two-sided p-value.
+    """
+    differences = numpy.asarray(differences, numpy.float64)
+    differences = differences[differences != 0.0]
+    count = len(differences)
+    if count == 0:
+        return 1.0
+    magnitudes = numpy.abs(differences)
+    order = numpy.argsort(magnitudes, kind="stable")
+    _, inverse, ties = numpy.unique(
+        magnitudes[order], return_inverse=True, return_counts=True
+    )
+    first_ranks = numpy.cumsum(ties) - ties
+    ranks = numpy.empty(count)
+    ranks[order] = (first_ranks + (ties + 1) / 2.0)[inverse]
+    statistic = ranks[differences > 0.0].sum()
+    mean = count * (count + 1) / 4.0
+    variance = count * (count + 1) * (2 * count + 1) / 24.0
+    variance -= (ties**3 - ties).sum() / 48.0
+    if variance <= 0.0:
+        return 1.0
+    deviation = max(abs(statistic - mean) - 0.5, 0.0)
+    return math.erfc(deviation / math.sqrt(2.0 * variance))
+
+
+def compare(
+    control,
+    experimental,
+    test="permutation",
+    alpha=0.05,
+    resamples=10000,
+    seed=0,
+):
+    """
+    Compare an experimental tracker to a control on one sequence.
+
+    Parameters:
+    control (numpy.ndarray): The per-frame values, such as IoU, of the control
+        tracker. Higher values are better.
+    experimental (numpy.ndarray): The per-frame values of the experimental
+        tracker.
+    test (string): The test which decides significance. It must be one of
+        TESTS. The bootstrap test is significant when the confidence interval
+        excludes zero.
+    alpha (float): The significance level.
+    resamples (int): The number of bootstrap resamples and permutations.
+    seed (int): The random number generator seed. A fixed seed makes the
+        outcome reproducible.
+
+    Returns:
+    Comparison: The mean difference, its confidence interval, the p-value,
+    and the outcome, which is one of OUTCOMES.
+    """
+    if test not in TESTS:
+        raise ValueError(f"{test} is not one of {TESTS}")
+    differences = paired_differences(control, experimental)
+    if len(differences) == 0:
+        return Comparison(numpy.nan, numpy.nan, numpy.nan, 1.0, NO_DIFFERENCE)
+    difference = float(differences.mean())
+    means = bootstrap_means(differences, resamples, seed)
+    low, high = (
+        float(end) for end in numpy.quantile(means, [alpha / 2, 1 - alpha / 2])
+    )
+    if test == "bootstrap":
+        tail = min(numpy.mean(means <= 0.0), numpy.mean(means >= 0.0))
+        p_value = min(1.0, 2.0 * float(tail))
+        significant = not low <= 0.0 <= high
+    elif test == "permutation":
+        p_value = permutation_test(differences, resamples, seed)
+        significant = p_value < alpha
+    else:
+        p_value = wilcoxon_test(differences)
+        significant = p_value < alpha
+    if not significant:
+        outcome = NO_DIFFERENCE
+    elif difference >= 0.0:
+        outcome = BETTER
+    else:
+        outcome = WORSE
+    return Comparison(difference, low, high, p_value, outcome)
+
+
+# -----------------------------------------------------------------------------
+#                                                      internal implementation
+# -----------------------------------------------------------------------------
+def _batches(total, width):
+    size = max(1, _BATCH_ELEMENTS // max(width, 1))
+    for start in range(0, total, size):
+        yield start, min(start + size, total)
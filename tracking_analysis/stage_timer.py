@@ -0,0 +1,176 @@
+"""
+Record the wall time and memory of pipeline stages.
+
+A StageTimer measures named stages, such as reading or rendering, for each
+sequence. Memory is measured with tracemalloc, which counts Python and numpy
+allocations. Stages which overlap in time, such as reads on a thread pool,
+share tracemalloc's peak, so their peak memory is approximate.
+"""
+
+import collections
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+STAGES = ["reading", "scoring", "rendering", "filesystem"]
+"""list: The pipeline stages of an analysis run."""
+
+TRACE_VERSION = 1
+
+StageRecord = collections.namedtuple(
+    "StageRecord",
+    [
+        "sequence",
+        "stage",
+        "start",
+        "seconds",
+        "allocated",
+        "peak",
+        "process",
+        "thread",
+    ],
+)
+"""
+namedtuple: One measured stage. The sequence is None for stages of the whole
+run. The start time is in seconds since the epoch. The allocated and peak
+memory are in bytes, relative to the allocation at the start of the stage.
+"""
+
+
+class StageTimer:
+    """Measure pipeline stages, and collect the measurements."""
+
+    def __init__(self, enabled=True):
+        """
+        Create a timer.
+
+        Parameters:
+        enabled (bool): If this is False, measure() does nothing. This lets
+            callers measure stages without checking if profiling is on.
+        """
+        self.enabled = enabled
+        self.records = []
+        self._start = time.perf_counter()
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def measure(self, sequence, stage):
+        """
+        Measure the code in a with block as one stage.
+
+        Parameters:
+        sequence (string): The sequence being processed, or None.
+        stage (string): The name of the stage.
+        """
+        if not self.enabled:
+            yield
+            return
+        start_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        start = time.time()
+        start_counter = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start_counter
+            memory, peak = tracemalloc.get_traced_memory()
+            self.records.append(
+                StageRecord(
+                    sequence,
+                    stage,
+                    start,
+                    seconds,
+                    memory - start_memory,
+                    max(peak - start_memory, 0),
+                    os.getpid(),
+                    threading.get_ident(),
+                )
+            )
+
+    def extend(self, records):
+        """
+        Add records measured by another timer, such as one in a worker process.
+
+        Parameters:
+        records (list): The StageRecord objects to add.
+        """
+        self.records.extend(StageRecord(*record) for record in records)
+
+    def summarize(self):
+        """
+        Total the records by stage.
+
+        Returns:
+        dict: For each stage, the number of records, the total, mean and
+        maximum seconds, the total bytes allocated, and the largest peak.
+        """
+        summary = {}
+        for record in self.records:
+            entry = summary.setdefault(
+                record.stage,
+                {
+                    "count": 0,
+                    "seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "allocated": 0,
+                    "peak": 0,
+                },
+            )
+            entry["count"] += 1
+            entry["seconds"] += record.seconds
+            entry["max_seconds"] = max(entry["max_seconds"], record.seconds)
+            entry["allocated"] += record.allocated
+            entry["peak"] = max(entry["peak"], record.peak)
+        for entry in summary.values():
+            entry["mean_seconds"] = entry["seconds"] / entry["count"]
+        return summary
+
+    def print_summary(self, file=sys.stdout):
+        """
+        Print the stage summary as a table.
+
+        Parameters:
+        file (file): The stream to print to.
+        """
+        summary = self.summarize()
+        print(
+            f"{'stage':12} {'count':>6} {'total s':>9} {'mean ms':>9} "
+            f"{'max ms':>9} {'alloc MiB':>10} {'peak MiB':>9}",
+            file=file,
+        )
+        order = STAGES + sorted(set(summary) - set(STAGES))
+        for stage in [s for s in order if s in summary]:
+            entry = summary[stage]
+            print(
+                f"{stage:12} {entry['count']:6} {entry['seconds']:9.3f} "
+                f"{entry['mean_seconds'] * 1e3:9.2f} "
+                f"{entry['max_seconds'] * 1e3:9.2f} "
+                f"{entry['allocated'] / 2**20:10.2f} "
+                f"{entry['peak'] / 2**20:9.2f}",
+                file=file,
+            )
+        print(f"wall time {time.perf_counter() - self._start:.3f} s", file=file)
+
+    def write_trace(self, filename):
+        """
+        Write every record, and the summary, to a JSON file.
+
+        Parameters:
+        filename (string): The path to the trace file.
+        """
+        with open(filename, "w") as f:
+            json.dump(
+                {
+                    "version": TRACE_VERSION,
+                    "wall_seconds": time.perf_counter() - self._start,
+                    "summary": self.summarize(),
+                    "records": [record._asdict() for record in self.records],
+                },
+                f,
+                indent=2,
+            )
@@ -1,20 +1,34 @@
 """Generate data OTB can use to generate graphs."""
 
 import argparse
+import concurrent.futures
+import csv
+import glob
 import os.path
+import sys
 
-# import sys
+import numpy
 
-import analysis_tools
-
-# import data_sets
+from . import analysis_tools
+from . import data_sets
+from . import dataset_cache
+from . import dataset_index
+from . import metrics
 
 __version__ = "0.0.0"
 
+OTB_FILE = "file.json"
+"""string: The name of the OTB file for a single result root."""
+
+LEADERBOARD = "leaderboard.csv"
+"""string: The name of the leaderboard written by a sweep."""
+
+_GROUND_TRUTH = []
 
-def _parse_arguments():
+
+def _parse_arguments(argv=None, prog=None):
     parser = argparse.ArgumentParser(
-        description="Generate data OTB can use to generate graphs."
+        prog=prog, description="Generate data OTB can use to generate graphs."
     )
     parser.add_argument(
         "--version",
@@ -43,10 +57,44 @@ def _parse_arguments():
     parser.add_argument(
         "--output-root",
         default=os.getcwd(),
-        help="The root directory to which the graphs should be written.",
+        help="The root directory to which the OTB files are written.",
         nargs="?",
     )
-    arguments = parser.parse_args()
+    parser.add_argument(
+        "--sweep",
+        help="Score every result root which matches these paths or glob "
+        "patterns, instead of the experimental root. The ground truth is read "
+        "once. One OTB file per result root, and a leaderboard of all of them, "
+        "are written to the output root.",
+        metavar="ROOT",
+        nargs="+",
+    )
+    parser.add_argument(
+        "--jobs",
+        default=1,
+        help="The number of worker processes used to score a sweep.",
+        type=int,
+    )
+    parser.add_argument(
+        "--cache-root",
+        default=dataset_cache.DEFAULT_CACHE_ROOT,
+        help="The directory in which parsed bounding box data is cached "
+        "between runs.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse every file, and do not read or write the cache. The cache "
+        "keeps every parsed file in memory, so use this to keep memory use "
+        "bounded on very large data sets.",
+    )
+    parser.add_argument(
+        "--prefetch",
+        default=2,
+        help="The number of sequences to read ahead on a background thread.",
+        type=int,
+    )
+    arguments = parser.parse_args(argv)
     arguments.experimental_root = os.path.expanduser(
         arguments.experimental_root
     )
@@ -54,61 +102,274 @@ def _parse_arguments():
         arguments.ground_truth_root
     )
     arguments.output_root = os.path.expanduser(arguments.output_root)
+    if arguments.jobs < 1:
+        sys.exit("--jobs must be at least 1.")
     return arguments
 
 
-def _main():
-    arguments = _parse_arguments()
-    exp_boxes = analysis_tools.read_bounding_boxes(arguments.experimental_root)
-    gt_boxes = analysis_tools.read_bounding_boxes(arguments.ground_truth_root)
-    # exp_dataset = data_sets.determine_data_set(exp_boxes.keys)
-    # gt_dataset = data_sets.determine_data_set(gt_boxes.keys)
-    # if exp_dataset is None:
-    #    sys.exit(
-    #        "error: Could not determine which data set the experimental data is from."
-    #    )
-    # if gt_dataset is None:
-    #    sys.exit(
-    #        "error: Could not determine which data set the ground truth data is from."
-    #    )
-    # if exp_dataset != gt_dataset:
-    #    sys.exit(
-    #        "error: Experimental and ground truth data appear to be from different data sets."
-    #    )
-    common = _find_common_sequences(gt_boxes.keys(), exp_boxes.keys())
-    new_dict = {}
-    for k in exp_boxes:
-        if k in common:
-            new_dict[k] = exp_boxes[k]
-    exp_boxes = new_dict
-    new_dict.clear()
-    for k in gt_boxes:
-        if k in common:
-            new_dict[k] = gt_boxes[k]
-    gt_boxes = new_dict
-
-    file_contents = {
+def main(argv=None, prog=None):
+    """
+    Score one or more result roots, and write the OTB files.
+
+    Parameters:
+    argv (list): The command line arguments. If this is None, sys.argv is
+        used.
+    prog (string): The program name shown in the usage message.
+    """
+    arguments = _parse_arguments(argv, prog)
+    if arguments.sweep:
+        _sweep(arguments)
+        return
+    caches = {}
+    if not arguments.no_cache:
+        for root in (arguments.ground_truth_root, arguments.experimental_root):
+            caches[root] = dataset_cache.DatasetCache(
+                root, arguments.cache_root
+            )
+    ground_truth_index = dataset_index.RootIndex(arguments.ground_truth_root)
+    experimental_index = dataset_index.RootIndex(arguments.experimental_root)
+    sequences = _check_data_sets(ground_truth_index, experimental_index)
+    file_contents = make_otb_data(
+        _score_sequences(
+            analysis_tools.iterate_bounding_boxes(
+                arguments.ground_truth_root,
+                arguments.experimental_root,
+                sequences,
+                prefetch=arguments.prefetch,
+                ground_truth_cache=caches.get(arguments.ground_truth_root),
+                result_cache=caches.get(arguments.experimental_root),
+                ground_truth_index=ground_truth_index,
+                result_index=experimental_index,
+            )
+        )
+    )
+    analysis_tools.write_otb_data(
+        file_contents, os.path.join(arguments.output_root, OTB_FILE)
+    )
+    for cache in caches.values():
+        cache.save()
+
+
+def make_otb_data(scores, eval_type="OPE", tracker="dMDNet"):
+    """
+    Build the OTB results document for one tracker.
+
+    Parameters:
+    scores (iterable): (sequence, ious, center_errors) tuples, one per
+        sequence. The arrays are per-frame. For evaluations with several runs
+        per sequence, the arrays hold every run's frames, run after run.
+    eval_type (string): The OTB evaluation type, such as "OPE", "TRE", or
+        "SRE".
+    tracker (string): The name of the tracker.
+
+    Returns:
+    dict: The document, ready to be written with
+    analysis_tools.write_otb_data().
+    """
+    accumulator = metrics.OtbAccumulator()
+    names = []
+    overlap_scores = []
+    error_numbers = []
+    for sequence, ious, center_errors in scores:
+        accumulator.add(ious, center_errors)
+        names.append(sequence)
+        overlap_scores.append(_to_json_list(ious))
+        error_numbers.append(_count_failures(ious))
+    success_curve = accumulator.success_curve
+    precision_curve = accumulator.precision_curve
+    return {
         "name": "test",
         "desc": "a test file",
-        "tracker": "dMDNet",
-        "evalType": "OPE",
-        "seqs": exp_boxes.keys(),
-        "overlap": 0.0,
-        "error": 0.0,
-        "overlapScores": [],
-        "errorNum": [],
-        "successRateList": [],
-        "precisionList": [],
+        "tracker": tracker,
+        "evalType": eval_type,
+        "seqs": names,
+        "overlap": accumulator.mean_iou,
+        "error": accumulator.mean_center_error,
+        "auc": metrics.calculate_auc(success_curve),
+        "precision20": metrics.precision_at(precision_curve),
+        "overlapScores": overlap_scores,
+        "errorNum": error_numbers,
+        "successRateList": success_curve.tolist(),
+        "precisionList": precision_curve.tolist(),
     }
-    analysis_tools.write_otb_data(file_contents)
+
+
+def tracker_names(roots):
+    """
+    Name the trackers of a sweep uniquely.
+
+    Parameters:
+    roots (list): The distinct absolute paths to the result roots.
+
+    Returns:
+    list: One name per root: its path relative to the common parent of all the
+    roots, with the path separators replaced by underscores. A root which is
+    the common parent is named for its directory. Names which would collide
+    get a "-2", "-3", ... suffix, in the order of the roots.
+    """
+    common = os.path.commonpath(roots)
+    names = []
+    for root in roots:
+        name = os.path.relpath(root, common).replace(os.sep, "_")
+        if name == os.curdir:
+            name = os.path.basename(root) or "root"
+        unique = name
+        count = 1
+        while unique in names:
+            count += 1
+            unique = f"{name}-{count}"
+        names.append(unique)
+    return names
 
 
 # ------------------------------------------------------------------------------
-#                                                         temporary operations
+#                                                      internal implementation
 # ------------------------------------------------------------------------------
-def _find_common_sequences(data_set_1, data_set_2):
-    return [s for s in data_set_1 if s in data_set_2]
+def _check_data_sets(ground_truth_index, experimental_index):
+    exp_sequences = experimental_index.sequences
+    exp_dataset = data_sets.determine_data_set(exp_sequences)
+    if exp_dataset is None:
+        print(
+            "warning: Could not determine which data set the experimental "
+            "data is from."
+        )
+        return exp_sequences
+    missing = data_sets.DATA_SETS[exp_dataset].sequences - frozenset(
+        ground_truth_index.sequences
+    )
+    if missing:
+        sys.exit(
+            f"error: The ground truth is missing {len(missing)} {exp_dataset} "
+            f"sequences: {', '.join(sorted(missing))}"
+        )
+    return exp_sequences
+
+
+def _score_sequences(sequences):
+    for sequence, gt_boxes, exp_boxes in sequences:
+        if len(gt_boxes) != len(exp_boxes):
+            print(f"warning: {sequence} has mismatched frame counts")
+            continue
+        yield (
+            sequence,
+            metrics.calculate_ious(gt_boxes, exp_boxes),
+            metrics.calculate_center_errors(gt_boxes, exp_boxes),
+        )
+
+
+def _count_failures(ious):
+    successes, total = metrics.count_successes(ious)
+    return (total - successes).tolist()
+
+
+def _to_json_list(values):
+    return [None if numpy.isnan(v) else v for v in values.tolist()]
+
+
+def _sweep(arguments):
+    roots = sorted(
+        {
+            os.path.abspath(root)
+            for pattern in arguments.sweep
+            for root in glob.glob(os.path.expanduser(pattern))
+            if os.path.isdir(root)
+        }
+    )
+    if not roots:
+        sys.exit("No result roots match --sweep.")
+    cache_root = None if arguments.no_cache else arguments.cache_root
+    cache = None
+    if cache_root is not None:
+        cache = dataset_cache.DatasetCache(
+            arguments.ground_truth_root, cache_root
+        )
+    ground_truth = analysis_tools.read_bounding_boxes(
+        arguments.ground_truth_root, cache
+    )
+    if cache is not None:
+        cache.save()
+    tasks = [
+        (name, root, os.path.join(arguments.output_root, f"{name}.json"))
+        for name, root in zip(tracker_names(roots), roots)
+    ]
+    print(f"Scoring {len(tasks)} result roots")
+    initargs = (ground_truth, cache_root)
+    if arguments.jobs == 1:
+        _set_up_worker(*initargs)
+        rows = list(map(_score_tracker, tasks))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+            arguments.jobs, initializer=_set_up_worker, initargs=initargs
+        ) as executor:
+            rows = list(executor.map(_score_tracker, tasks))
+    _write_leaderboard(os.path.join(arguments.output_root, LEADERBOARD), rows)
+
+
+def _set_up_worker(ground_truth, cache_root):
+    _GROUND_TRUTH[:] = [(ground_truth, cache_root)]
+
+
+def _read_results(ground_truth, result_index, cache):
+    for sequence in result_index.sequences:
+        filename = analysis_tools.find_bounding_box_file(
+            result_index, sequence, analysis_tools.RESULT_FILES
+        )
+        if sequence not in ground_truth or filename is None:
+            continue
+        result = analysis_tools.read_bounding_box_file(filename, cache)
+        if result is not None:
+            yield sequence, ground_truth[sequence], result
+
+
+def _score_tracker(task):
+    name, root, filename = task
+    ground_truth, cache_root = _GROUND_TRUTH[0]
+    cache = None
+    if cache_root is not None:
+        cache = dataset_cache.DatasetCache(root, cache_root)
+    document = make_otb_data(
+        _score_sequences(
+            _read_results(ground_truth, dataset_index.RootIndex(root), cache)
+        ),
+        tracker=name,
+    )
+    analysis_tools.write_otb_data(document, filename)
+    if cache is not None:
+        cache.save()
+    return [
+        name,
+        document["auc"],
+        document["precision20"],
+        document["overlap"],
+        document["error"],
+        len(document["seqs"]),
+        root,
+    ]
+
+
+def _write_leaderboard(filename, rows):
+    rows = sorted(rows, key=lambda row: -row[1] if row[1] == row[1] else 1.0)
+    with analysis_tools.open_atomically(filename, newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            [
+                "rank",
+                "tracker",
+                "auc",
+                "precision20",
+                "overlap",
+                "error",
+                "sequences",
+                "root",
+            ]
+        )
+        for rank, row in enumerate(rows, start=1):
+            writer.writerow(
+                [rank, row[0]]
+                + [f"{value:.4f}" for value in row[1:5]]
+                + row[5:]
+            )
 
 
 if __name__ == "__main__":
-    _main()
+    main()